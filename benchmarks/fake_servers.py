@@ -0,0 +1,279 @@
+"""
+本地模拟的微信读书和 Notion 服务，用于性能测试
+
+两个服务共用一个 HTTP 端口：微信读书接口使用原路径（/api/user/notebook、/web/...），
+Notion 接口使用 /v1/ 前缀。支持配置延迟、按比例注入 429，以及生成 N 本书 × M 条划线的书库。
+"""
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def build_library(books, highlights, notes):
+    """生成模拟书库: {书籍ID: 笔记本条目 + 划线和笔记}"""
+    library = {}
+    for index in range(books):
+        book_id = str(100000 + index)
+        bookmarks = [
+            {
+                "bookmarkId": f"{book_id}_{i}",
+                "chapterUid": i % 10 + 1,
+                "range": f"{i * 20}-{i * 20 + 10}",
+                "markText": f"第 {book_id} 本书的第 {i} 条划线 " + "内容" * 20,
+            }
+            for i in range(highlights)
+        ]
+        reviews = [
+            {
+                "review": {
+                    "reviewId": f"{book_id}_r{i}",
+                    "type": 1,
+                    "chapterUid": i % 10 + 1,
+                    "range": f"{i * 20}-{i * 20 + 5}",
+                    "content": f"第 {book_id} 本书的第 {i} 条笔记",
+                }
+            }
+            for i in range(notes)
+        ]
+        library[book_id] = {
+            "book": {
+                "bookId": book_id,
+                "title": f"模拟书籍 {book_id}",
+                "author": "模拟作者",
+                "cover": "https://example.com/s_cover.jpg",
+            },
+            "sort": 1700000000 + index,
+            "bookmarkCount": len(bookmarks),
+            "reviewCount": len(reviews),
+            "noteCount": len(bookmarks) + len(reviews),
+            "bookmarks": bookmarks,
+            "reviews": reviews,
+        }
+    return library
+
+
+class FakeServerState:
+    """
+    模拟服务的数据和统计
+
+    Args:
+        books: 书籍数量
+        highlights: 每本书的划线数量
+        notes: 每本书的笔记数量
+        latency: 每个请求的额外延迟（秒）
+        rate_429: Notion 请求返回 429 的比例（0-1）
+        seed: 随机种子
+    """
+
+    def __init__(self, books=10, highlights=20, notes=5, latency=0.0, rate_429=0.0, seed=0):
+        self.library = build_library(books, highlights, notes)
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.throttled = 0
+        self.pages = {}
+        self.blocks = {}
+
+    def reset_counters(self):
+        with self.lock:
+            self.requests.clear()
+            self.throttled = 0
+
+
+def to_page_properties(properties):
+    """把写入的属性转换成 Notion 返回的格式（补上 plain_text）"""
+    result = json.loads(json.dumps(properties))
+    for value in result.values():
+        for key in ("title", "rich_text"):
+            for item in value.get(key, []):
+                item["plain_text"] = item.get("text", {}).get("content", "")
+    return result
+
+
+def match_filter(page, condition):
+    """支持脚本用到的数据库查询过滤条件"""
+    if not condition:
+        return True
+    if "and" in condition:
+        return all(match_filter(page, item) for item in condition["and"])
+    prop = page["properties"].get(condition["property"], {})
+    for key in ("title", "rich_text"):
+        if key in condition:
+            text = "".join(item["plain_text"] for item in prop.get(key, []))
+            return text == condition[key]["equals"]
+    if "relation" in condition:
+        ids = [item["id"].replace("-", "") for item in prop.get("relation", [])]
+        if "contains" in condition["relation"]:
+            return condition["relation"]["contains"].replace("-", "") in ids
+        if condition["relation"].get("is_not_empty"):
+            return bool(ids)
+    return True
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 响应头和响应体分两次写出时，Nagle 算法会让每个请求多等一个延迟 ACK
+    disable_nagle_algorithm = True
+    state = None
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def handle_request(self, method):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        body = self.read_json() if method in ("POST", "PATCH") else {}
+        state = self.state
+        endpoint = f"{method} {re.sub(r'/[0-9a-f-]{32,36}', '/{id}', url.path)}"
+        with state.lock:
+            state.requests[endpoint] += 1
+            throttled = url.path.startswith("/v1/") and state.random.random() < state.rate_429
+            if throttled:
+                state.throttled += 1
+        if state.latency:
+            time.sleep(state.latency)
+        if throttled:
+            return self.send_json(
+                429,
+                {"object": "error", "status": 429, "code": "rate_limited", "message": "Rate limited"},
+                {"Retry-After": "1"},
+            )
+        if url.path.startswith("/v1/"):
+            return self.handle_notion(method, url.path, body)
+        return self.handle_weread(url.path, query, body)
+
+    def handle_weread(self, path, query, body):
+        library = self.state.library
+        if path == "/":
+            return self.send_json(200, {})
+        if path == "/api/user/notebook":
+            books = [
+                {key: value for key, value in item.items() if key not in ("bookmarks", "reviews")}
+                for item in library.values()
+            ]
+            return self.send_json(200, {"books": books})
+        if path == "/web/book/bookmarklist":
+            synckey = int(query.get("synckey") or 0)
+            updated = [] if synckey else library[query["bookId"]]["bookmarks"]
+            return self.send_json(200, {"updated": updated, "removed": [], "synckey": 1})
+        if path == "/web/review/list":
+            synckey = int(query.get("syncKey") or 0)
+            reviews = [] if synckey else library[query["bookId"]]["reviews"]
+            return self.send_json(200, {"reviews": reviews, "removed": [], "syncKey": 1})
+        if path == "/web/book/readinfo":
+            return self.send_json(200, {"markedStatus": 2, "readingProgress": 50})
+        if path == "/web/book/info":
+            return self.send_json(200, {"isbn": "9787000000000", "newRating": 820, "intro": "模拟简介"})
+        if path == "/web/book/chapterInfos":
+            data = []
+            for book_id, synckey in zip(body.get("bookIds", []), body.get("synckeys", [])):
+                chapters = [
+                    {"chapterUid": uid, "chapterIdx": uid, "title": f"第{uid}章", "level": 1}
+                    for uid in range(1, 11)
+                ]
+                data.append({"bookId": book_id, "synckey": 1, "updated": [] if synckey else chapters})
+            return self.send_json(200, {"data": data})
+        return self.send_json(404, {"errcode": -1})
+
+    def handle_notion(self, method, path, body):
+        state = self.state
+        match = re.match(r"^/v1/databases/([^/]+)/query$", path)
+        if match:
+            database_id = match.group(1).replace("-", "")
+            with state.lock:
+                results = [
+                    page for page in state.pages.values()
+                    if page["parent"]["database_id"].replace("-", "") == database_id
+                    and match_filter(page, body.get("filter"))
+                ]
+            start = int(body.get("start_cursor") or 0)
+            size = body.get("page_size", 100)
+            has_more = start + size < len(results)
+            return self.send_json(200, {
+                "object": "list",
+                "results": results[start : start + size],
+                "has_more": has_more,
+                "next_cursor": str(start + size) if has_more else None,
+            })
+        if path == "/v1/pages" and method == "POST":
+            children = body.get("children", [])
+            if len(children) > 100:
+                return self.send_json(400, {"object": "error", "status": 400, "code": "validation_error", "message": "children"})
+            page = {
+                "object": "page",
+                "id": str(uuid.uuid4()),
+                "parent": body["parent"],
+                "properties": to_page_properties(body.get("properties", {})),
+                "last_edited_time": "2024-01-01T00:00:00.000Z",
+            }
+            with state.lock:
+                state.pages[page["id"]] = page
+                state.blocks[page["id"]] = [dict(child, id=str(uuid.uuid4())) for child in children]
+            return self.send_json(200, page)
+        match = re.match(r"^/v1/pages/([^/]+)$", path)
+        if match:
+            with state.lock:
+                page = state.pages.get(match.group(1))
+                if page and method == "PATCH":
+                    page["properties"].update(to_page_properties(body.get("properties", {})))
+            if page is None:
+                return self.send_json(404, {"object": "error", "status": 404, "code": "object_not_found", "message": "page"})
+            return self.send_json(200, page)
+        match = re.match(r"^/v1/blocks/([^/]+)/children$", path)
+        if match:
+            with state.lock:
+                blocks = state.blocks.setdefault(match.group(1), [])
+                if method == "PATCH":
+                    children = [dict(child, id=str(uuid.uuid4())) for child in body.get("children", [])]
+                    blocks.extend(children)
+                    return self.send_json(200, {"object": "list", "results": children})
+                return self.send_json(200, {"object": "list", "results": list(blocks), "has_more": False, "next_cursor": None})
+        match = re.match(r"^/v1/blocks/([^/]+)$", path)
+        if match and method == "DELETE":
+            with state.lock:
+                for page_id, blocks in state.blocks.items():
+                    state.blocks[page_id] = [block for block in blocks if block["id"] != match.group(1)]
+            return self.send_json(200, {"object": "block", "id": match.group(1)})
+        return self.send_json(404, {"object": "error", "status": 404, "code": "object_not_found", "message": path})
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def do_PATCH(self):
+        self.handle_request("PATCH")
+
+    def do_DELETE(self):
+        self.handle_request("DELETE")
+
+
+def start_fake_server(state, port=0):
+    """在后台线程启动模拟服务，返回 (server, base_url)"""
+    handler = type("Handler", (FakeHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
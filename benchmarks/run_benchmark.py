@@ -0,0 +1,166 @@
+"""
+同步性能测试：启动本地模拟服务，端到端运行 scripts/weread.py
+
+每个场景依次运行两次：第一次是全量同步（空的 Notion 和本地状态），第二次是没有变化的定时同步。
+报告耗时、各接口请求数、429 次数和子进程内存峰值，结果追加到 benchmarks/results.jsonl，
+并与同样参数的上一次结果对比，方便发现不同版本之间的性能退化。
+
+示例:
+    python benchmarks/run_benchmark.py --books 50 --highlights 100 --latency 0.05
+    python benchmarks/run_benchmark.py --rate-429 0.05 -- --workers 4
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from fake_servers import FakeServerState, start_fake_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "scripts", "weread.py")
+RESULTS_FILE = os.path.join(ROOT, "benchmarks", "results.jsonl")
+
+
+def get_git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        return None
+
+
+def run_sync(state, base_url, state_folder, extra_args):
+    """运行一次同步，返回本次运行的指标"""
+    env = dict(
+        os.environ,
+        NOTION_TOKEN="benchmark",
+        WEREAD_COOKIE="wr_skey=benchmark",
+        CC_ID="",
+        CC_PASSWORD="",
+        WEREAD_BASE_URL=base_url,
+        NOTION_BASE_URL=base_url,
+        STATE_FOLDER=state_folder,
+    )
+    state.reset_counters()
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, SCRIPT] + extra_args,
+        cwd=state_folder,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall_time = time.perf_counter() - started
+    if process.returncode != 0:
+        print(process.stdout[-2000:])
+        print(process.stderr[-2000:])
+        raise SystemExit(f"同步失败，退出码 {process.returncode}")
+    failures = process.stdout.count("❌")
+    with state.lock:
+        requests = dict(sorted(state.requests.items()))
+        throttled = state.throttled
+    return {
+        "wall_time": round(wall_time, 3),
+        "requests": requests,
+        "total_requests": sum(requests.values()),
+        "throttled": throttled,
+        "failures": failures,
+    }
+
+
+def get_peak_memory_mb():
+    """已结束子进程的内存峰值（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux 上单位是 KB，macOS 上是字节
+    return round(peak / 1024 / (1024 if sys.platform == "darwin" else 1), 1)
+
+
+def load_previous(params):
+    if not os.path.exists(RESULTS_FILE):
+        return None
+    previous = None
+    with open(RESULTS_FILE, "r", encoding="utf-8") as f:
+        for line in f:
+            result = json.loads(line)
+            if result.get("params") == params:
+                previous = result
+    return previous
+
+
+def print_run(name, run, previous_run=None):
+    change = ""
+    if previous_run:
+        delta = run["wall_time"] - previous_run["wall_time"]
+        change = f"（上次 {previous_run['wall_time']}s，{delta:+.3f}s）"
+    print(f"\n{name}: {run['wall_time']}s{change}，{run['total_requests']} 次请求，429 {run['throttled']} 次，失败 {run['failures']} 本")
+    for endpoint, count in run["requests"].items():
+        print(f"    {endpoint}: {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="微信读书 → Notion 同步性能测试")
+    parser.add_argument("--books", type=int, default=10, help="书籍数量")
+    parser.add_argument("--highlights", type=int, default=20, help="每本书的划线数量")
+    parser.add_argument("--notes", type=int, default=5, help="每本书的笔记数量")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的模拟延迟（秒）")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Notion 请求返回 429 的比例")
+    parser.add_argument("--rate-limit", type=float, default=100.0, help="传给脚本的 NOTION_RATE_LIMIT")
+    parser.add_argument("--no-save", action="store_true", help="不把结果写入 results.jsonl")
+    parser.add_argument("args", nargs="*", help="传给 weread.py 的参数（放在 -- 之后）")
+    options = parser.parse_args()
+
+    params = {
+        "books": options.books,
+        "highlights": options.highlights,
+        "notes": options.notes,
+        "latency": options.latency,
+        "rate_429": options.rate_429,
+        "rate_limit": options.rate_limit,
+        "args": options.args,
+    }
+    os.environ["NOTION_RATE_LIMIT"] = str(options.rate_limit)
+    state = FakeServerState(
+        books=options.books,
+        highlights=options.highlights,
+        notes=options.notes,
+        latency=options.latency,
+        rate_429=options.rate_429,
+    )
+    server, base_url = start_fake_server(state)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            state_folder = os.path.join(workdir, "OUT_FOLDER")
+            os.makedirs(state_folder)
+            full_sync = run_sync(state, base_url, state_folder, options.args)
+            idle_sync = run_sync(state, base_url, state_folder, options.args)
+    finally:
+        server.shutdown()
+
+    result = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "revision": get_git_revision(),
+        "params": params,
+        "full_sync": full_sync,
+        "idle_sync": idle_sync,
+        "pages": len(state.pages),
+        "peak_memory_mb": get_peak_memory_mb(),
+    }
+    previous = load_previous(params)
+    print(f"参数: {json.dumps(params, ensure_ascii=False)}")
+    print_run("全量同步", full_sync, previous and previous["full_sync"])
+    print_run("无变化同步", idle_sync, previous and previous["idle_sync"])
+    print(f"\n创建页面 {result['pages']} 个，子进程内存峰值 {result['peak_memory_mb']} MB")
+    if not options.no_save:
+        with open(RESULTS_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        print(f"结果已追加到 {os.path.relpath(RESULTS_FILE, ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import base64
+import hashlib
+import hmac
+import os
+import time
+
+from state import load_state, save_state
+
+# 本地缓存的上次有效的微信读书 Cookie（用 CookieCloud 密码加密）
+# 虽然在状态目录中，但已加入 .gitignore，不会随 OUT_FOLDER 提交到仓库
+COOKIE_CACHE_FILE = "cookie_cache.json"
+PBKDF2_ITERATIONS = 100_000
+
+
+def _derive_keys(password, salt, iterations):
+    """由密码派生加密密钥和校验密钥"""
+    key = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations, dklen=64)
+    return key[:32], key[32:]
+
+
+def _xor_keystream(key, nonce, data):
+    """HMAC-SHA256 计数器模式生成密钥流，与数据异或（加密和解密相同）"""
+    stream = bytearray()
+    for counter in range((len(data) + 31) // 32):
+        stream += hmac.new(key, nonce + counter.to_bytes(8, "big"), hashlib.sha256).digest()
+    return bytes(a ^ b for a, b in zip(data, stream))
+
+
+def encrypt_cookie(cookie, password):
+    """加密 Cookie，返回可以写入 JSON 的 dict"""
+    salt, nonce = os.urandom(16), os.urandom(16)
+    enc_key, mac_key = _derive_keys(password, salt, PBKDF2_ITERATIONS)
+    ciphertext = _xor_keystream(enc_key, nonce, cookie.encode("utf-8"))
+    tag = hmac.new(mac_key, salt + nonce + ciphertext, hashlib.sha256).digest()
+    encode = lambda value: base64.b64encode(value).decode("ascii")
+    return {
+        "iterations": PBKDF2_ITERATIONS,
+        "salt": encode(salt),
+        "nonce": encode(nonce),
+        "ciphertext": encode(ciphertext),
+        "tag": encode(tag),
+        "saved_at": int(time.time()),
+    }
+
+
+def decrypt_cookie(payload, password):
+    """解密 Cookie；密码不对或内容被篡改时返回 None"""
+    try:
+        salt, nonce, ciphertext, tag = (
+            base64.b64decode(payload[key]) for key in ("salt", "nonce", "ciphertext", "tag")
+        )
+        enc_key, mac_key = _derive_keys(password, salt, int(payload["iterations"]))
+    except (KeyError, TypeError, ValueError):
+        return None
+    expected = hmac.new(mac_key, salt + nonce + ciphertext, hashlib.sha256).digest()
+    if not hmac.compare_digest(expected, tag):
+        return None
+    return _xor_keystream(enc_key, nonce, ciphertext).decode("utf-8")
+
+
+def load_cached_cookie(password):
+    """读取本地缓存的 Cookie，没有缓存或无法解密时返回 None"""
+    payload = load_state(COOKIE_CACHE_FILE)
+    if not payload:
+        return None
+    return decrypt_cookie(payload, password)
+
+
+def save_cached_cookie(cookie, password):
+    """把验证有效的 Cookie 加密写入本地缓存"""
+    save_state(COOKIE_CACHE_FILE, encrypt_cookie(cookie, password))
@@ -0,0 +1,61 @@
+from bisect import bisect_right
+from collections import defaultdict
+
+
+def parse_range(value):
+    """解析微信读书的 range（"起始-结束" 字符偏移），无法解析时返回 None"""
+    try:
+        start, end = str(value).split("-", 1)
+        start, end = int(start), int(end)
+    except (TypeError, ValueError):
+        return None
+    return (start, end) if start <= end else (end, start)
+
+
+class IntervalIndex:
+    """
+    按章节分组的区间索引，用于查找与一条划线位置重叠的笔记
+
+    每个章节内的区间按起点排序，并记录前缀最大终点：
+    查询时只需从起点不大于查询终点的位置向前扫描，前缀最大终点小于查询起点时即可停止
+    """
+
+    def __init__(self):
+        self.pending = defaultdict(list)
+        self.chapters = {}
+
+    def add(self, chapter_uid, range_value, value):
+        """加入一个区间；range 无法解析时忽略并返回 False"""
+        interval = parse_range(range_value)
+        if interval is None:
+            return False
+        self.pending[chapter_uid].append((interval[0], interval[1], value))
+        self.chapters.pop(chapter_uid, None)
+        return True
+
+    def _get_chapter(self, chapter_uid):
+        chapter = self.chapters.get(chapter_uid)
+        if chapter is None:
+            intervals = sorted(self.pending.get(chapter_uid, []), key=lambda x: x[0])
+            max_ends = []
+            for _, end, _ in intervals:
+                max_ends.append(max(end, max_ends[-1]) if max_ends else end)
+            chapter = self.chapters[chapter_uid] = (
+                [start for start, _, _ in intervals], max_ends, intervals
+            )
+        return chapter
+
+    def query(self, chapter_uid, range_value):
+        """返回同一章节中与 range 重叠（含首尾相接）的区间的值，按起点排序"""
+        interval = parse_range(range_value)
+        if interval is None or chapter_uid not in self.pending:
+            return []
+        starts, max_ends, intervals = self._get_chapter(chapter_uid)
+        result = []
+        index = bisect_right(starts, interval[1]) - 1
+        while index >= 0 and max_ends[index] >= interval[0]:
+            if intervals[index][1] >= interval[0]:
+                result.append(intervals[index][2])
+            index -= 1
+        result.reverse()
+        return result
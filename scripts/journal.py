@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+
+
+class SyncJournal:
+    """
+    Notion 写操作的预写日志（JSON Lines，每行一条记录）
+
+    每次创建或更新页面之前写入 "plan" 记录（fsync 落盘），成功后写入带页面ID的 "commit" 记录；
+    书籍同步完成后删除这本书的全部记录（压缩日志），所以日志中只保留未完成书籍的操作。
+    中途退出后再次运行时：
+    - 已 commit 的操作可以直接补记到台账，不需要重新查询
+    - 只有 plan 没有 commit 的创建操作可能已经在 Notion 中生效，需要确认后才能重新创建
+
+    Args:
+        path: 日志文件路径
+        read_only: 为 True 时只读取不写入（--plan）
+    """
+
+    def __init__(self, path, read_only=False):
+        self.path = path
+        self.read_only = read_only
+        self.lock = threading.Lock()
+        # 未完成书籍的操作: {书籍ID: {(类型, 微信读书ID): 最新的记录}}
+        self.books = {}
+        self._load()
+        # 上次运行留下的操作，本次运行中确认或完成后移除
+        self.recovered = {
+            (record["kind"], record["id"]): record
+            for operations in self.books.values()
+            for record in operations.values()
+        }
+        self.file = None
+        if not read_only:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._rewrite()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 写到一半退出留下的不完整的行
+                    continue
+                self.books.setdefault(record["book"], {})[(record["kind"], record["id"])] = record
+
+    def _rewrite(self):
+        """只保留未完成书籍的记录重写日志（先写临时文件再替换）"""
+        if self.file is not None:
+            self.file.close()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for operations in self.books.values():
+                for record in operations.values():
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def _append(self, record, sync=False):
+        if self.read_only:
+            return
+        with self.lock:
+            self.books.setdefault(record["book"], {})[(record["kind"], record["id"])] = record
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.file.flush()
+            if sync:
+                os.fsync(self.file.fileno())
+
+    def plan(self, book_id, kind, weread_id, action, content_hash=None):
+        """Notion 请求之前记录计划执行的操作（"create" 或 "update"）"""
+        self._append(
+            {"op": "plan", "book": book_id, "kind": kind, "id": weread_id, "action": action, "hash": content_hash},
+            sync=True,
+        )
+
+    def commit(self, book_id, kind, weread_id, page_id, content_hash=None):
+        """Notion 请求成功后记录页面ID"""
+        self.recovered.pop((kind, weread_id), None)
+        self._append(
+            {"op": "commit", "book": book_id, "kind": kind, "id": weread_id, "page_id": page_id, "hash": content_hash}
+        )
+
+    def get_committed(self):
+        """上次运行已完成但书籍没有同步完的操作"""
+        return [record for record in self.recovered.values() if record["op"] == "commit"]
+
+    def is_in_doubt(self, kind, weread_id):
+        """上次运行计划创建但没有记录结果的操作（页面可能已经创建）"""
+        record = self.recovered.get((kind, weread_id))
+        return record is not None and record["op"] == "plan" and record["action"] == "create"
+
+    def resolve(self, kind, weread_id):
+        """待确认的操作已确认（页面已存在或确认不存在），不再需要检查"""
+        self.recovered.pop((kind, weread_id), None)
+
+    def get_unfinished_books(self):
+        return list(self.books)
+
+    def complete_book(self, book_id):
+        """书籍同步完成，从日志中删除这本书的记录"""
+        if self.read_only:
+            return
+        with self.lock:
+            if self.books.pop(book_id, None) is not None:
+                self._rewrite()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
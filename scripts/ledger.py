@@ -0,0 +1,155 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from urllib.request import pathname2url
+
+
+def get_content_hash(content):
+    """内容哈希，用于发现在微信读书中被编辑过的笔记和划线"""
+    return hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+
+
+class SyncLedger:
+    """
+    本地同步台账（SQLite）
+    记录微信读书ID（书籍/划线/笔记）与 Notion 页面ID、内容哈希的对应关系，
+    划线和笔记另外记录位置（章节和 range），用于关联位置重叠的划线和笔记
+
+    Args:
+        path: SQLite 文件路径
+        read_only: 为 True 时只读取不写入（--plan）
+    """
+
+    def __init__(self, path, read_only=False):
+        self.read_only = read_only
+        if read_only:
+            # 只读时不创建也不修改台账文件：已有的台账复制到内存数据库中使用
+            self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+            if os.path.exists(path):
+                source = sqlite3.connect(f"file:{pathname2url(os.path.abspath(path))}?mode=ro", uri=True)
+                source.backup(self.conn)
+                source.close()
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    kind TEXT NOT NULL,
+                    weread_id TEXT NOT NULL,
+                    book_id TEXT,
+                    page_id TEXT NOT NULL,
+                    content_hash TEXT,
+                    updated_at TEXT,
+                    chapter_uid INTEGER,
+                    mark_range TEXT,
+                    PRIMARY KEY (kind, weread_id)
+                )
+                """
+            )
+            # 旧版本的台账没有位置字段
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(entries)")}
+            for column, column_type in (("chapter_uid", "INTEGER"), ("mark_range", "TEXT")):
+                if column not in columns:
+                    self.conn.execute(f"ALTER TABLE entries ADD COLUMN {column} {column_type}")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS entries_book ON entries (book_id)")
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    page_id TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    PRIMARY KEY (page_id, field)
+                )
+                """
+            )
+
+    def get(self, kind, weread_id):
+        """返回 (页面ID, 内容哈希)，没有记录时返回 None"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT page_id, content_hash FROM entries WHERE kind = ? AND weread_id = ?",
+                (kind, weread_id),
+            ).fetchone()
+
+    def put(self, kind, weread_id, book_id, page_id, content_hash=None, chapter_uid=None, mark_range=None):
+        """新增或更新一条记录；没有传入位置时保留已记录的位置"""
+        if self.read_only:
+            return
+        with self.lock, self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO entries
+                    (kind, weread_id, book_id, page_id, content_hash, updated_at, chapter_uid, mark_range)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (kind, weread_id) DO UPDATE SET
+                    book_id = excluded.book_id,
+                    page_id = excluded.page_id,
+                    content_hash = excluded.content_hash,
+                    updated_at = excluded.updated_at,
+                    chapter_uid = COALESCE(excluded.chapter_uid, chapter_uid),
+                    mark_range = COALESCE(excluded.mark_range, mark_range)
+                """,
+                (
+                    kind, weread_id, book_id, page_id, content_hash,
+                    datetime.now().isoformat(), chapter_uid, mark_range,
+                ),
+            )
+
+    def get_annotations(self, book_id, kind):
+        """返回一本书已同步的划线或笔记 {微信读书ID: {"chapterUid", "range", "page_id"}}"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT weread_id, chapter_uid, mark_range, page_id FROM entries WHERE book_id = ? AND kind = ?",
+                (book_id, kind),
+            ).fetchall()
+        return {
+            weread_id: {"chapterUid": chapter_uid, "range": mark_range, "page_id": page_id}
+            for weread_id, chapter_uid, mark_range, page_id in rows
+        }
+
+    def put_positions(self, kind, positions):
+        """为已有记录补充位置 {微信读书ID: (章节, range)}（迁移旧版本的增量同步状态）"""
+        if self.read_only:
+            return
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE entries SET chapter_uid = ?, mark_range = ? WHERE kind = ? AND weread_id = ?",
+                [(chapter_uid, mark_range, kind, weread_id) for weread_id, (chapter_uid, mark_range) in positions.items()],
+            )
+
+    def delete(self, kind, weread_ids):
+        """删除已在微信读书中删除的划线或笔记的记录"""
+        if self.read_only or not weread_ids:
+            return
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "DELETE FROM entries WHERE kind = ? AND weread_id = ?",
+                [(kind, weread_id) for weread_id in weread_ids],
+            )
+
+    def get_fingerprints(self, page_id):
+        """返回页面上次写入的各属性哈希 {属性名: 哈希}"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT field, hash FROM fingerprints WHERE page_id = ?", (page_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def put_fingerprints(self, page_id, fingerprints):
+        """记录页面写入成功的各属性哈希"""
+        if self.read_only:
+            return
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO fingerprints (page_id, field, hash) VALUES (?, ?, ?)",
+                [(page_id, field, value) for field, value in fingerprints.items()],
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
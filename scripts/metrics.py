@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+from collections import defaultdict
+
+# 延迟直方图的分桶上限（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+
+class EndpointStats:
+    """单个接口的统计"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.rate_limit_wait = 0.0
+        self.backoff_wait = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+    def observe(self, latency):
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+        for index, upper in enumerate(LATENCY_BUCKETS):
+            if latency <= upper:
+                self.buckets[index] += 1
+                break
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "latency_sum": round(self.latency_sum, 4),
+            "latency_avg": round(self.latency_sum / self.calls, 4) if self.calls else 0,
+            "latency_max": round(self.latency_max, 4),
+            "rate_limit_wait": round(self.rate_limit_wait, 4),
+            "backoff_wait": round(self.backoff_wait, 4),
+            "latency_buckets": {
+                ("+Inf" if upper == float("inf") else str(upper)): count
+                for upper, count in zip(LATENCY_BUCKETS, self.buckets)
+            },
+        }
+
+
+class RequestMetrics:
+    """
+    按接口统计请求次数、错误、重试、字节数和延迟直方图
+    限流等待和重试退避的 sleep 时间单独统计
+    """
+
+    def __init__(self):
+        self.endpoints = defaultdict(EndpointStats)
+        self.sleeps = defaultdict(float)
+        self.lock = threading.Lock()
+        # 可选的回调 on_sleep(kind, seconds)，例如 --profile 把等待时间计入 sleeps 阶段
+        self.on_sleep = None
+
+    def record_request(self, endpoint, latency, error=False):
+        with self.lock:
+            stats = self.endpoints[endpoint]
+            stats.calls += 1
+            stats.errors += 1 if error else 0
+            stats.observe(latency)
+
+    def record_retry(self, endpoint):
+        with self.lock:
+            self.endpoints[endpoint].retries += 1
+
+    def record_bytes(self, endpoint, sent=0, received=0):
+        with self.lock:
+            stats = self.endpoints[endpoint]
+            stats.bytes_sent += sent
+            stats.bytes_received += received
+
+    def record_sleep(self, kind, seconds, endpoint=None):
+        """记录 sleep 时间，kind 为 rate_limit（限流等待）或 retry_backoff（重试退避）"""
+        if not seconds:
+            return
+        with self.lock:
+            self.sleeps[kind] += seconds
+            if endpoint is not None:
+                stats = self.endpoints[endpoint]
+                if kind == "rate_limit":
+                    stats.rate_limit_wait += seconds
+                else:
+                    stats.backoff_wait += seconds
+        if self.on_sleep is not None:
+            self.on_sleep(kind, seconds)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "endpoints": {name: stats.to_dict() for name, stats in sorted(self.endpoints.items())},
+                "sleep_seconds": {kind: round(seconds, 4) for kind, seconds in self.sleeps.items()},
+            }
+
+    def write_json(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def write_prometheus(self, path):
+        """写入 Prometheus textfile collector 格式"""
+        data = self.to_dict()
+        lines = [
+            "# TYPE weread_sync_requests_total counter",
+            "# TYPE weread_sync_request_errors_total counter",
+            "# TYPE weread_sync_request_retries_total counter",
+            "# TYPE weread_sync_request_bytes_total counter",
+            "# TYPE weread_sync_request_duration_seconds histogram",
+            "# TYPE weread_sync_request_wait_seconds_total counter",
+            "# TYPE weread_sync_sleep_seconds_total counter",
+        ]
+        for name, stats in data["endpoints"].items():
+            label = f'endpoint="{name}"'
+            lines.append(f"weread_sync_requests_total{{{label}}} {stats['calls']}")
+            lines.append(f"weread_sync_request_errors_total{{{label}}} {stats['errors']}")
+            lines.append(f"weread_sync_request_retries_total{{{label}}} {stats['retries']}")
+            lines.append(f'weread_sync_request_bytes_total{{{label},direction="sent"}} {stats["bytes_sent"]}')
+            lines.append(f'weread_sync_request_bytes_total{{{label},direction="received"}} {stats["bytes_received"]}')
+            cumulative = 0
+            for upper, count in stats["latency_buckets"].items():
+                cumulative += count
+                lines.append(f'weread_sync_request_duration_seconds_bucket{{{label},le="{upper}"}} {cumulative}')
+            lines.append(f"weread_sync_request_duration_seconds_sum{{{label}}} {stats['latency_sum']}")
+            lines.append(f"weread_sync_request_duration_seconds_count{{{label}}} {stats['calls']}")
+            lines.append(f'weread_sync_request_wait_seconds_total{{{label},kind="rate_limit"}} {stats["rate_limit_wait"]}')
+            lines.append(f'weread_sync_request_wait_seconds_total{{{label},kind="retry_backoff"}} {stats["backoff_wait"]}')
+        for kind, seconds in data["sleep_seconds"].items():
+            lines.append(f'weread_sync_sleep_seconds_total{{kind="{kind}"}} {seconds}')
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+
+    def print_summary(self):
+        data = self.to_dict()
+        print("\n📊 请求统计:")
+        for name, stats in data["endpoints"].items():
+            print(
+                f"  {name}: {stats['calls']} 次，错误 {stats['errors']}，重试 {stats['retries']}，"
+                f"平均 {stats['latency_avg']:.3f}s，最长 {stats['latency_max']:.3f}s，"
+                f"限流等待 {stats['rate_limit_wait']:.2f}s"
+            )
+        for kind, seconds in data["sleep_seconds"].items():
+            print(f"  ⏳ {kind} 等待: {seconds:.2f}s")
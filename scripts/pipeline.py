@@ -0,0 +1,81 @@
+import queue
+import threading
+from itertools import islice
+
+# 队列结束标记
+_DONE = object()
+
+
+def run_pipeline(items, fetch_batch, write, workers=1, batch_size=8, maxsize=None):
+    """
+    有界队列流水线：生产者线程按批获取数据放入队列，workers 个写入线程从队列中取出并写入
+    队列满时生产者阻塞（背压），内存中最多只有 maxsize + batch_size 条已获取的数据；
+    写入线程处理当前数据时，生产者同时获取下一批
+
+    Args:
+        items: 待处理的条目（可以是惰性的迭代器，生产者在需要获取下一批时才取出条目）
+        fetch_batch: fetch_batch(一批条目) → 与条目顺序对应的数据列表
+        write: write(序号, 条目, 数据)，在写入线程中执行
+        workers: 写入线程数量
+        batch_size: 每批获取的条目数量
+        maxsize: 队列容量，默认为写入线程数量的两倍
+
+    Yields:
+        (条目, 异常)：按完成顺序返回，成功时异常为 None
+    """
+    workers = max(1, workers)
+    batch_size = max(1, batch_size)
+    tasks = queue.Queue(maxsize=maxsize or workers * 2)
+    results = queue.Queue()
+
+    def produce():
+        iterator = iter(items)
+        index = 0
+        try:
+            while True:
+                batch = list(islice(iterator, batch_size))
+                if not batch:
+                    break
+                try:
+                    data = fetch_batch(batch)
+                except Exception as e:
+                    for item in batch:
+                        results.put((item, e))
+                else:
+                    for offset, (item, value) in enumerate(zip(batch, data)):
+                        tasks.put((index + offset, item, value))
+                index += len(batch)
+        finally:
+            for _ in range(workers):
+                tasks.put(_DONE)
+
+    def consume():
+        while True:
+            task = tasks.get()
+            if task is _DONE:
+                results.put(_DONE)
+                return
+            index, item, value = task
+            try:
+                write(index, item, value)
+            except Exception as e:
+                results.put((item, e))
+            else:
+                results.put((item, None))
+
+    threads = [threading.Thread(target=produce, name="pipeline-fetch", daemon=True)]
+    threads += [
+        threading.Thread(target=consume, name=f"pipeline-write-{i}", daemon=True) for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    # 生产者结束后每个写入线程各放入一个结束标记，全部收到时所有条目都已处理完
+    finished = 0
+    while finished < workers:
+        result = results.get()
+        if result is _DONE:
+            finished += 1
+        else:
+            yield result
+    for thread in threads:
+        thread.join()
@@ -0,0 +1,110 @@
+import threading
+import uuid
+from collections import Counter
+
+# 写入类的 Notion 接口 → 计划中的操作类型
+WRITE_OPERATIONS = {
+    "PagesEndpoint.create": "create",
+    "PagesEndpoint.update": "update",
+    "BlocksChildrenEndpoint.append": "append",
+    "BlocksEndpoint.delete": "delete",
+}
+# 计划中不属于某本书的操作（启动时加载书籍目录、去重索引等）
+GLOBAL_KEY = "__global__"
+
+
+class SyncPlan:
+    """
+    同步计划（--plan）：记录每本书会执行的 Notion 操作，写入操作只记录不执行
+
+    Args:
+        rate_limit: Notion 请求速率（次/秒），用于估算耗时
+        targets: {数据库ID: 名称}，用于在计划中标注页面所属的数据库
+    """
+
+    def __init__(self, rate_limit, targets=None):
+        self.rate_limit = rate_limit
+        self.targets = {key.replace("-", ""): name for key, name in (targets or {}).items()}
+        self.books = {GLOBAL_KEY: {"title": "启动", "operations": [], "requests": Counter()}}
+        self.order = [GLOBAL_KEY]
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def start_book(self, book_id, title):
+        """之后当前线程记录的操作都归属这本书"""
+        with self.lock:
+            if book_id not in self.books:
+                self.books[book_id] = {"title": title, "operations": [], "requests": Counter()}
+                self.order.append(book_id)
+        self.local.book_id = book_id
+
+    def record(self, op, target=None, detail=None, request=True):
+        """记录一个操作；request 为 False 表示不产生 Notion 请求（例如跳过）"""
+        book = self.books[getattr(self.local, "book_id", GLOBAL_KEY)]
+        with self.lock:
+            book["operations"].append({"op": op, "target": target, "detail": detail})
+            if request:
+                book["requests"][op] += 1
+
+    def record_write(self, qualname, kwargs):
+        """
+        记录写入操作并返回模拟的响应
+        不是写入接口时返回 None，调用方应正常发送请求
+        """
+        op = WRITE_OPERATIONS.get(qualname)
+        if op is None:
+            return None
+        if op == "create":
+            parent = kwargs.get("parent", {}).get("database_id", "")
+            self.record(op, self.targets.get(parent.replace("-", ""), parent), self._get_title(kwargs))
+            return {"id": f"plan-{uuid.uuid4()}", "last_edited_time": None}
+        if op == "update":
+            self.record(op, kwargs.get("page_id"), ", ".join(kwargs.get("properties", {})))
+            return {"id": kwargs.get("page_id"), "last_edited_time": None}
+        if op == "append":
+            self.record(op, kwargs.get("block_id"), f"{len(kwargs.get('children', []))} blocks")
+            return {"results": []}
+        self.record(op, kwargs.get("block_id"))
+        return {}
+
+    @staticmethod
+    def _get_title(kwargs):
+        title = kwargs.get("properties", {}).get("名称", {}).get("title", [])
+        text = "".join(item.get("text", {}).get("content", "") for item in title)
+        return text[:50]
+
+    def to_dict(self):
+        totals = Counter()
+        books = []
+        for book_id in self.order:
+            book = self.books[book_id]
+            totals.update(book["requests"])
+            books.append({
+                "book_id": book_id,
+                "title": book["title"],
+                "requests": dict(book["requests"]),
+                "skipped": sum(1 for item in book["operations"] if item["op"] == "skip"),
+                "operations": book["operations"],
+            })
+        total_requests = sum(totals.values())
+        return {
+            "rate_limit": self.rate_limit,
+            "total_requests": total_requests,
+            "requests": dict(totals),
+            "estimated_seconds": round(total_requests / self.rate_limit, 1) if self.rate_limit else None,
+            "books": books,
+        }
+
+    def print_summary(self):
+        plan = self.to_dict()
+        print("\n" + "=" * 50)
+        print("📋 同步计划（未写入 Notion）")
+        print("=" * 50)
+        for book in plan["books"]:
+            if not book["requests"] and not book["skipped"]:
+                continue
+            requests = ", ".join(f"{op} {count}" for op, count in sorted(book["requests"].items()))
+            print(f"  {book['title']}: {requests or '无请求'}；跳过 {book['skipped']} 项")
+        requests = ", ".join(f"{op} {count}" for op, count in sorted(plan["requests"].items()))
+        print(f"\n共 {plan['total_requests']} 次 Notion 请求（{requests}）")
+        print(f"按 {self.rate_limit} 次/秒估算约需 {plan['estimated_seconds']} 秒")
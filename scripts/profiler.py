@@ -0,0 +1,214 @@
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+# Python 3.12 起 cProfile 基于 sys.monitoring，一个 Profile 会记录所有线程；
+# 更早的版本只记录调用 enable() 的线程，需要为每个工作线程单独创建 Profile
+PROFILE_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+class StageTimer:
+    """
+    按阶段累计耗时
+    阶段可以嵌套：inclusive 为总耗时，exclusive 不含嵌套阶段的时间
+    """
+
+    def __init__(self):
+        self.inclusive = defaultdict(float)
+        self.exclusive = defaultdict(float)
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        # 线程ID → 阶段栈，采样线程据此给调用栈标注阶段
+        self.active = {}
+
+    def _get_stack(self):
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+            self.active[threading.get_ident()] = stack
+        return stack
+
+    @contextmanager
+    def stage(self, name):
+        stack = self._get_stack()
+        # [阶段名, 开始时间, 嵌套阶段耗时]
+        frame = [name, time.perf_counter(), 0.0]
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            stack.pop()
+            elapsed = time.perf_counter() - frame[1]
+            if stack:
+                stack[-1][2] += elapsed
+            with self.lock:
+                self.inclusive[name] += elapsed
+                self.exclusive[name] += elapsed - frame[2]
+                self.counts[name] += 1
+
+    def record_nested(self, name, seconds):
+        """把当前阶段中已经过去的一段时间（例如限流等待）单独计入 name 阶段"""
+        stack = self._get_stack()
+        if stack:
+            stack[-1][2] += seconds
+        with self.lock:
+            self.inclusive[name] += seconds
+            self.exclusive[name] += seconds
+            self.counts[name] += 1
+
+    def get_current(self, thread_id):
+        """线程当前所在的阶段（供其他线程读取）"""
+        try:
+            return self.active[thread_id][-1][0]
+        except (KeyError, IndexError):
+            return None
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                name: {
+                    "count": self.counts[name],
+                    "inclusive": round(self.inclusive[name], 4),
+                    "exclusive": round(self.exclusive[name], 4),
+                }
+                for name in sorted(self.exclusive, key=self.exclusive.get, reverse=True)
+            }
+
+
+class SamplingProfiler(threading.Thread):
+    """定时采样所有线程的调用栈，输出 collapsed-stack 格式（flamegraph.pl / speedscope 可读）"""
+
+    def __init__(self, stages, interval=0.005):
+        super().__init__(name="sampling-profiler", daemon=True)
+        self.stages = stages
+        self.interval = interval
+        self.samples = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    name = getattr(code, "co_qualname", code.co_name)
+                    names.append(f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                names.reverse()
+                stage = self.stages.get_current(thread_id)
+                if stage:
+                    names.insert(0, f"[{stage}]")
+                self.samples[";".join(names)] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class Profiler:
+    """
+    性能分析（--profile）：cProfile 记录函数调用，采样线程生成火焰图数据，
+    StageTimer 按阶段统计耗时
+
+    Args:
+        interval: 采样间隔（秒）
+    """
+
+    def __init__(self, interval=0.005):
+        self.stages = StageTimer()
+        self.sampler = SamplingProfiler(self.stages, interval)
+        self.profiles = []
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.started = None
+        self.wall_time = None
+
+    def _enable(self):
+        profile = getattr(self.local, "profile", None)
+        if profile is None:
+            profile = self.local.profile = cProfile.Profile()
+            self.local.depth = 0
+            with self.lock:
+                self.profiles.append(profile)
+        if self.local.depth == 0:
+            profile.enable()
+        self.local.depth += 1
+
+    def _disable(self):
+        self.local.depth -= 1
+        if self.local.depth == 0:
+            self.local.profile.disable()
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.sampler.start()
+        self._enable()
+
+    def stop(self):
+        self._disable()
+        self.sampler.stop()
+        self.wall_time = time.perf_counter() - self.started
+
+    def wrap(self, func):
+        """在工作线程中执行的函数需要用 wrap 包装，才会被 cProfile 记录"""
+        if PROFILE_ALL_THREADS:
+            return func
+
+        def wrapper(*args, **kwargs):
+            self._enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._disable()
+
+        return wrapper
+
+    def stage(self, name):
+        return self.stages.stage(name)
+
+    def _get_stats(self):
+        """合并所有线程的 cProfile 数据"""
+        with self.lock:
+            profiles = list(self.profiles)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+    def write(self, folder, prefix="profile"):
+        """写入 pstats、collapsed-stack 和阶段耗时文件，返回文件路径列表"""
+        os.makedirs(folder, exist_ok=True)
+        pstats_path = os.path.join(folder, f"{prefix}.pstats")
+        self._get_stats().dump_stats(pstats_path)
+
+        collapsed_path = os.path.join(folder, f"{prefix}.collapsed")
+        with open(collapsed_path, "w", encoding="utf-8") as f:
+            for stack, count in self.sampler.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+        stages_path = os.path.join(folder, f"{prefix}_stages.json")
+        with open(stages_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"wall_time": round(self.wall_time or 0, 4), "stages": self.stages.to_dict()},
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+        return [pstats_path, collapsed_path, stages_path]
+
+    def print_summary(self, limit=15):
+        print(f"\n⏱️ 阶段耗时（总耗时 {self.wall_time:.2f}s，多线程时各阶段为线程时间之和）:")
+        for name, stage in self.stages.to_dict().items():
+            print(f"  {name}: {stage['exclusive']:.2f}s（含嵌套 {stage['inclusive']:.2f}s，{stage['count']} 次）")
+        print(f"\n🔥 自身耗时最多的 {limit} 个函数:")
+        self._get_stats().strip_dirs().sort_stats("tottime").print_stats(limit)
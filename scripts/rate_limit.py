@@ -0,0 +1,55 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    令牌桶限流器，多个线程共享同一个实例
+    被限流时按 AIMD 调整速率：乘性降低，之后每次成功加性恢复，直到初始速率
+
+    Args:
+        rate: 每秒补充的令牌数（即平均请求速率）
+        capacity: 桶容量（允许的突发请求数），默认与速率相同
+        min_rate: 降低速率时的下限
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=0.2):
+        self.rate = float(rate)
+        self.max_rate = self.rate
+        self.min_rate = min(float(min_rate), self.rate)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        """取得一个令牌，令牌不足时阻塞等待，返回等待的秒数"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def decrease(self, factor=0.5):
+        """观察到限流时降低速率，并清空已积累的令牌"""
+        with self.lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate * factor)
+            self.tokens = min(self.tokens, 0.0)
+
+    def increase(self, step=0.05):
+        """请求成功时逐步恢复速率"""
+        with self.lock:
+            if self.rate < self.max_rate:
+                self._refill()
+                self.rate = min(self.max_rate, self.rate + step)
@@ -0,0 +1,184 @@
+import random
+import threading
+import time
+
+import requests
+
+# Notion 可以重试的错误码（APIErrorCode 的值）
+NOTION_RETRY_CODES = {
+    "rate_limited",
+    "conflict_error",
+    "internal_server_error",
+    "service_unavailable",
+}
+
+
+class RetryPolicy:
+    """
+    单个接口的重试策略：带抖动的指数退避，优先使用服务端返回的 Retry-After
+
+    Args:
+        max_attempts: 单次调用最多尝试的次数
+        base_delay: 第一次重试前的基础等待秒数
+        max_delay: 单次等待的上限秒数
+        budget: 整次运行（--daemon 时为每一轮）中该接口因错误最多重试的次数，用完后不再重试；
+            被限流（429）时按服务端要求等待后重试，不占用预算，只受 max_attempts 限制
+    """
+
+    def __init__(self, max_attempts=5, base_delay=1.0, max_delay=60.0, budget=50):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.retries = 0
+        self.lock = threading.Lock()
+
+    def allow_retry(self, attempt, throttled=False):
+        """第 attempt 次尝试失败后是否还能重试（被限流以外的错误会占用一次重试预算）"""
+        if attempt >= self.max_attempts:
+            return False
+        if throttled:
+            return True
+        with self.lock:
+            if self.retries >= self.budget:
+                return False
+            self.retries += 1
+            return True
+
+    def reset_budget(self):
+        """重新开始计算重试预算"""
+        with self.lock:
+            self.retries = 0
+
+    def get_delay(self, attempt, retry_after=None):
+        """第 attempt 次失败后的等待秒数"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, min(self.max_delay, retry_after))
+        return delay
+
+
+class RetryPolicies:
+    """按接口名称分别维护重试策略和预算"""
+
+    def __init__(self, **defaults):
+        self.defaults = defaults
+        self.policies = {}
+        self.lock = threading.Lock()
+
+    def get(self, endpoint):
+        with self.lock:
+            if endpoint not in self.policies:
+                self.policies[endpoint] = RetryPolicy(**self.defaults)
+            return self.policies[endpoint]
+
+    def reset_budgets(self):
+        """重置所有接口的重试预算（--daemon 每一轮开始时调用）"""
+        with self.lock:
+            policies = list(self.policies.values())
+        for policy in policies:
+            policy.reset_budget()
+
+
+def parse_retry_after(headers):
+    """解析 Retry-After 响应头（秒数），无法解析时返回 None"""
+    value = headers.get("Retry-After") if headers else None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_notion_error(result, error):
+    """返回 (是否重试, 是否被限流, Retry-After)"""
+    if error is None:
+        return False, False, None
+    # notion_client 和 httpx 导入较慢，只在出错时导入（调用方此时已经导入过）
+    import httpx
+    from notion_client.errors import APIErrorCode, APIResponseError, RequestTimeoutError
+
+    if isinstance(error, APIResponseError):
+        throttled = error.code == APIErrorCode.RateLimited
+        retry = error.code in NOTION_RETRY_CODES or error.status >= 500
+        return retry, throttled, parse_retry_after(error.headers) if throttled else None
+    if isinstance(error, (RequestTimeoutError, httpx.TransportError)):
+        return True, False, None
+    return False, False, None
+
+
+def classify_notion_write_error(result, error):
+    """
+    不幂等的写操作（创建页面、追加块）：只在被限流或请求没有发出（连接阶段失败）时重试
+    读超时和 5xx 时 Notion 可能已经执行了请求，重试会重复创建，直接抛出异常，由预写日志确认
+    返回 (是否重试, 是否被限流, Retry-After)
+    """
+    if error is None:
+        return False, False, None
+    import httpx
+    from notion_client.errors import APIErrorCode, APIResponseError, RequestTimeoutError
+
+    if isinstance(error, APIResponseError):
+        throttled = error.code == APIErrorCode.RateLimited
+        return throttled, throttled, parse_retry_after(error.headers) if throttled else None
+    # notion_client 把 httpx 的超时包装为 RequestTimeoutError，原异常在 __context__ 中
+    if isinstance(error, RequestTimeoutError):
+        error = error.__context__
+    # 连接失败、连接超时、等待连接池超时时请求还没有发送到 Notion
+    not_sent = isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+    return not_sent, False, None
+
+
+def classify_weread_response(response, error):
+    """返回 (是否重试, 是否被限流, Retry-After)"""
+    if error is not None:
+        return isinstance(error, requests.RequestException), False, None
+    if response.status_code == 429:
+        return True, True, parse_retry_after(response.headers)
+    if response.status_code >= 500:
+        return True, False, None
+    return False, False, None
+
+
+def call_with_retry(func, policy, classify, limiter=None, metrics=None, endpoint=None):
+    """
+    按重试策略调用 func
+    每次尝试前从 limiter 取令牌；被限流时降低 limiter 速率，成功时逐步恢复
+
+    Args:
+        func: 无参数的调用
+        policy: RetryPolicy
+        classify: (返回值, 异常) → (是否重试, 是否被限流, Retry-After)
+        limiter: 共享的 TokenBucket（可选）
+        metrics: RequestMetrics（可选），记录每次尝试的耗时、错误、重试和等待时间
+        endpoint: metrics 中的接口名称
+    """
+    attempt = 0
+    while True:
+        if limiter is not None:
+            waited = limiter.acquire()
+            if metrics is not None:
+                metrics.record_sleep("rate_limit", waited, endpoint)
+        result, error = None, None
+        started = time.perf_counter()
+        try:
+            result = func()
+        except Exception as e:
+            error = e
+        retry, throttled, retry_after = classify(result, error)
+        if metrics is not None:
+            metrics.record_request(endpoint, time.perf_counter() - started, error=error is not None or retry)
+        if limiter is not None:
+            if throttled:
+                limiter.decrease()
+            elif not retry:
+                limiter.increase()
+        attempt += 1
+        if not retry or not policy.allow_retry(attempt, throttled):
+            if error is not None:
+                raise error
+            return result
+        delay = policy.get_delay(attempt, retry_after)
+        if metrics is not None:
+            metrics.record_retry(endpoint)
+            metrics.record_sleep("retry_backoff", delay, endpoint)
+        time.sleep(delay)
@@ -0,0 +1,110 @@
+import heapq
+import threading
+import time
+
+
+def get_pending_work(book_data, previous=None):
+    """
+    估算一本书待同步的划线和笔记数量
+    有上次同步的指纹时按数量的变化估算，否则按全部数量估算
+    """
+    previous = previous or {}
+    pending = 0
+    for field in ("bookmarkCount", "reviewCount"):
+        pending += abs((book_data.get(field) or 0) - (previous.get(field) or 0))
+    return pending
+
+
+class BookScheduler:
+    """
+    按优先级和时间预算安排书籍同步（--time-budget）
+
+    书籍按最近变化时间（笔记本列表中的 sort）从新到旧排列，时间相同时待同步内容少的优先；
+    每本书的耗时按 (1 + 待同步数量) 个工作单位估算，每单位耗时用指数移动平均（EMA）根据已完成的书籍修正。
+    取出下一本书时，如果已派发未完成的书籍加上这本书预计会超过截止时间，就把它留到下次运行；
+    只要还没到截止时间，第一本书总会派发（此时还没有实际耗时可以参考），保证每次运行都有进展。
+    已派发的书籍在队列中等待时可能已经来不及，写入线程开始处理前用 start() 再检查一次。
+
+    Args:
+        books: [(书籍数据, 待同步数量)]
+        deadline: 截止时间（time.monotonic()），None 表示不限时间
+        workers: 同时写入的线程数量
+        unit_seconds: 每个工作单位的初始估计耗时（秒）
+        alpha: EMA 的平滑系数
+    """
+
+    def __init__(self, books, deadline=None, workers=1, unit_seconds=1.0, alpha=0.3):
+        self.heap = []
+        for order, (book_data, pending) in enumerate(books):
+            heapq.heappush(self.heap, (-(book_data.get("sort") or 0), pending, order, book_data))
+        self.deadline = deadline
+        self.workers = max(1, workers)
+        self.unit_seconds = unit_seconds
+        self.alpha = alpha
+        self.in_flight = {}
+        self.deferred = []
+        self.deferred_ids = set()
+        self.dispatched = 0
+        self.started = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.heap)
+
+    @staticmethod
+    def _get_key(book_data):
+        return book_data.get("book", {}).get("bookId")
+
+    def estimate(self, units):
+        return units * self.unit_seconds
+
+    def _defer(self, book_data):
+        self.deferred.append(book_data)
+        self.deferred_ids.add(self._get_key(book_data))
+
+    def is_deferred(self, book_data):
+        return self._get_key(book_data) in self.deferred_ids
+
+    def __iter__(self):
+        """按优先级依次取出书籍；时间预算不足的书籍放入 deferred"""
+        while self.heap:
+            _, pending, _, book_data = heapq.heappop(self.heap)
+            units = 1 + pending
+            with self.lock:
+                estimate = self.estimate(units)
+                if self.deadline is not None:
+                    queued = sum(self.estimate(value) for value in self.in_flight.values())
+                    remaining = self.deadline - time.monotonic()
+                    if remaining <= 0 or (
+                        self.dispatched and (queued + estimate) / self.workers > remaining
+                    ):
+                        self._defer(book_data)
+                        continue
+                self.in_flight[self._get_key(book_data)] = units
+                self.dispatched += 1
+            yield book_data
+
+    def start(self, book_data):
+        """
+        写入线程开始处理一本已派发的书籍前调用
+        已过截止时间，或者剩余时间不够完成这本书（第一本书除外）时改为留到下次，返回 False
+        """
+        with self.lock:
+            key = self._get_key(book_data)
+            if self.deadline is not None:
+                remaining = self.deadline - time.monotonic()
+                units = self.in_flight.get(key, 1)
+                if remaining <= 0 or (self.started and self.estimate(units) > remaining):
+                    self.in_flight.pop(key, None)
+                    self._defer(book_data)
+                    return False
+            self.started += 1
+            return True
+
+    def done(self, book_data, elapsed):
+        """一本书处理完成（成功或失败），用实际耗时修正每单位耗时的估计"""
+        with self.lock:
+            units = self.in_flight.pop(self._get_key(book_data), None)
+            if units:
+                observed = elapsed / units
+                self.unit_seconds = self.alpha * observed + (1 - self.alpha) * self.unit_seconds
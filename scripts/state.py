@@ -0,0 +1,33 @@
+import json
+import os
+
+# 本地状态文件目录，默认为 OUT_FOLDER；状态文件已加入 .gitignore，GitHub Actions 中通过 Actions cache 保存
+STATE_FOLDER = os.getenv("STATE_FOLDER", "OUT_FOLDER")
+
+
+def get_state_path(name):
+    """获取状态文件路径"""
+    return os.path.join(STATE_FOLDER, name)
+
+
+def load_state(name, default=None):
+    """读取状态文件，不存在或损坏时返回默认值"""
+    path = get_state_path(name)
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  读取状态文件 {path} 失败: {e}")
+        return default
+
+
+def save_state(name, data):
+    """写入状态文件（先写临时文件再替换，避免中途退出留下半个文件）"""
+    path = get_state_path(name)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
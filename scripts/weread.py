@@ -1,17 +1,21 @@
 import argparse
+import atexit
+import contextlib
 import json
 import logging
 import os
 import re
+import signal
+import sys
+import threading
 import time
-from notion_client import Client
+from concurrent.futures import Future
 import requests
 from requests.utils import cookiejar_from_dict
 from http.cookies import SimpleCookie
 from datetime import datetime
 import hashlib
 from dotenv import load_dotenv
-from retrying import retry
 from utils import (
     get_callout,
     get_date,
@@ -29,17 +33,33 @@ from utils import (
     get_status,
     get_relation,
 )
+from interval_index import IntervalIndex
+from cookie_cache import load_cached_cookie, save_cached_cookie
+from journal import SyncJournal
+from ledger import SyncLedger, get_content_hash
+from metrics import RequestMetrics
+from pipeline import run_pipeline
+from rate_limit import TokenBucket
+from retry_policy import RetryPolicies, call_with_retry, classify_notion_error, classify_notion_write_error
+from scheduler import BookScheduler, get_pending_work
+from state import STATE_FOLDER, get_state_path, load_state, save_state
+from weread_session import WereadSession, is_session_expired
 
 load_dotenv()
 
-# 微信读书 API URLs
-WEREAD_URL = "https://weread.qq.com/"
-WEREAD_NOTEBOOKS_URL = "https://weread.qq.com/api/user/notebook"
-WEREAD_BOOKMARKLIST_URL = "https://weread.qq.com/web/book/bookmarklist"
-WEREAD_CHAPTER_INFO = "https://weread.qq.com/web/book/chapterInfos"
-WEREAD_READ_INFO_URL = "https://weread.qq.com/web/book/readinfo"
-WEREAD_REVIEW_LIST_URL = "https://weread.qq.com/web/review/list"
-WEREAD_BOOK_INFO = "https://weread.qq.com/web/book/info"
+# 微信读书 API URLs（WEREAD_BASE_URL 可指向本地模拟服务，见 benchmarks/）
+WEREAD_BASE_URL = os.getenv("WEREAD_BASE_URL", "https://weread.qq.com").rstrip("/")
+WEREAD_URL = f"{WEREAD_BASE_URL}/"
+WEREAD_NOTEBOOKS_URL = f"{WEREAD_BASE_URL}/api/user/notebook"
+WEREAD_BOOKMARKLIST_URL = f"{WEREAD_BASE_URL}/web/book/bookmarklist"
+WEREAD_CHAPTER_INFO = f"{WEREAD_BASE_URL}/web/book/chapterInfos"
+WEREAD_READ_INFO_URL = f"{WEREAD_BASE_URL}/web/book/readinfo"
+WEREAD_REVIEW_LIST_URL = f"{WEREAD_BASE_URL}/web/review/list"
+WEREAD_BOOK_INFO = f"{WEREAD_BASE_URL}/web/book/info"
+# CookieCloud 请求超时（秒）
+COOKIECLOUD_TIMEOUT = float(os.getenv("COOKIECLOUD_TIMEOUT", "10"))
+# Notion API 地址
+NOTION_BASE_URL = os.getenv("NOTION_BASE_URL", "https://api.notion.com").rstrip("/")
 
 # Notion 数据库 ID (从环境变量或直接配置)
 # 书籍数据库: collection://2bbdd161-f4eb-8186-a76d-000b09f5ad17
@@ -49,9 +69,127 @@ BOOK_DATABASE_ID = os.getenv("BOOK_DATABASE_ID", "2bbdd161f4eb81e596d4c922546f10
 NOTE_DATABASE_ID = os.getenv("NOTE_DATABASE_ID", "2bbdd161f4eb813fa96deee0a105c004")
 INFO_DATABASE_ID = os.getenv("INFO_DATABASE_ID", "2bbdd161f4eb8141bf2ee02d3a908745")
 NOTION_TOKEN = os.getenv("NOTION_TOKEN")
+# Notion API 平均限速约 3 次/秒，所有线程共享同一个令牌桶
+NOTION_RATE_LIMIT = float(os.getenv("NOTION_RATE_LIMIT", "3"))
+notion_limiter = TokenBucket(NOTION_RATE_LIMIT)
+# Notion 每个接口的重试策略，被限流时按 Retry-After 等待并降低全局速率
+notion_retry_policies = RetryPolicies(max_attempts=5, base_delay=1.0, max_delay=60.0, budget=100)
+# 微信读书请求的全局速率上限
+WEREAD_RATE_LIMIT = float(os.getenv("WEREAD_RATE_LIMIT", "10"))
+weread_limiter = TokenBucket(WEREAD_RATE_LIMIT)
+# 同时进行的微信读书请求数量上限
+WEREAD_FETCH_CONCURRENCY = int(os.getenv("WEREAD_FETCH_CONCURRENCY", "8"))
+# 已获取微信读书数据、等待写入 Notion 的书籍数量上限（0 表示 --workers 的两倍）
+WEREAD_QUEUE_SIZE = int(os.getenv("WEREAD_QUEUE_SIZE", "0"))
+# 增量同步状态文件，记录每本书上次同步成功时的笔记本指纹
+SYNC_STATE_FILE = "sync_state.json"
+# --plan 输出的同步计划
+PLAN_FILE = "sync_plan.json"
+# 本地同步台账：微信读书ID ↔ Notion 页面ID 和内容哈希
+LEDGER_FILE = "sync_ledger.sqlite3"
+# Notion 写操作的预写日志，中途退出后再次运行时从这里恢复
+JOURNAL_FILE = "sync_journal.jsonl"
+# 运行结束时写入的请求统计；METRICS_PROM_FILE 设置时另外写一份 Prometheus textfile
+METRICS_FILE = "metrics.json"
+METRICS_PROM_FILE = os.getenv("METRICS_PROM_FILE")
 if not NOTION_TOKEN:
     raise Exception("NOTION_TOKEN 环境变量未设置，请按照文档配置")
 
+# --daemon 的轮询间隔（秒）：有变化时回到最短间隔，没有变化时每轮乘以 DAEMON_BACKOFF，直到最长间隔
+DAEMON_INTERVAL_MIN = float(os.getenv("DAEMON_INTERVAL_MIN", "30"))
+DAEMON_INTERVAL_MAX = float(os.getenv("DAEMON_INTERVAL_MAX", "600"))
+DAEMON_BACKOFF = 1.5
+# 内存中的书籍目录和去重索引的有效期（秒），--daemon 时超过后重新加载，以发现在 Notion 中的手动修改
+CATALOG_TTL = float(os.getenv("CATALOG_TTL", "3600"))
+# --time-budget：单次同步（--daemon 时每一轮）的时间预算（秒），0 表示不限；
+# 预留 SYNC_TIME_MARGIN 比例的时间用于收尾，剩余书籍留到下次同步
+SYNC_TIME_BUDGET = float(os.getenv("SYNC_TIME_BUDGET", "0"))
+SYNC_TIME_MARGIN = 0.1
+catalogs_loaded_at = None
+# 同步计划（--plan），不为 None 时写入操作只记录不执行
+sync_plan = None
+# 按接口统计微信读书和 Notion 请求
+request_metrics = RequestMetrics()
+# 性能分析（--profile），不为 None 时按阶段统计耗时
+profiler = None
+PROFILE_PREFIX = "profile"
+# Notion 接口 → 性能分析中的阶段
+NOTION_STAGES = {
+    "PagesEndpoint.create": "page_create",
+    "PagesEndpoint.update": "page_update",
+    "BlocksChildrenEndpoint.append": "block_append",
+    "BlocksChildrenEndpoint.list": "block_replace",
+    "BlocksEndpoint.delete": "block_replace",
+}
+# 不幂等的 Notion 写操作：超时或 5xx 时可能已经生效，不自动重试（见 classify_notion_write_error）
+NOTION_NON_IDEMPOTENT = {"PagesEndpoint.create", "BlocksChildrenEndpoint.append"}
+
+
+def profile_stage(name):
+    """--profile 时把代码块的耗时计入 name 阶段"""
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.stage(name)
+
+
+def notion_request(method, **kwargs):
+    """
+    经过全局限流器和重试策略调用 Notion API，例如 notion_request(client.pages.create, ...)
+    """
+    if sync_plan is not None:
+        response = sync_plan.record_write(method.__qualname__, kwargs)
+        if response is not None:
+            return response
+        sync_plan.record("query", method.__qualname__)
+    endpoint = f"notion {method.__qualname__}"
+
+    def send():
+        response = method(**kwargs)
+        # notion_client 不暴露原始响应，字节数按 JSON 序列化长度估算
+        request_metrics.record_bytes(
+            endpoint,
+            len(json.dumps(kwargs, ensure_ascii=False).encode("utf-8")),
+            len(json.dumps(response, ensure_ascii=False).encode("utf-8")),
+        )
+        return response
+
+    with profile_stage(NOTION_STAGES.get(method.__qualname__, "notion_query")):
+        return call_with_retry(
+            send,
+            notion_retry_policies.get(method.__qualname__),
+            classify_notion_write_error
+            if method.__qualname__ in NOTION_NON_IDEMPOTENT
+            else classify_notion_error,
+            notion_limiter,
+            request_metrics,
+            endpoint,
+        )
+
+
+def write_metrics(prom_path=None, verbose=True):
+    """写入请求统计（JSON），prom_path 不为空时另外写入 Prometheus textfile"""
+    path = get_state_path(METRICS_FILE)
+    request_metrics.write_json(path)
+    if verbose:
+        print(f"📊 请求统计已写入 {path}")
+    if prom_path:
+        request_metrics.write_prometheus(prom_path)
+
+
+def write_profile():
+    """停止性能分析，写入 pstats、collapsed-stack 和阶段耗时"""
+    profiler.stop()
+    profiler.print_summary()
+    for path in profiler.write(STATE_FOLDER, PROFILE_PREFIX):
+        print(f"⏱️ 性能分析已写入 {path}")
+
+
+def record_plan_skip(target, detail=None):
+    """--plan 时记录一个跳过的操作"""
+    if sync_plan is not None:
+        sync_plan.record("skip", target, detail, request=False)
+
+
 def parse_cookie_string(cookie_string):
     cookie = SimpleCookie()
     cookie.load(cookie_string)
@@ -63,131 +201,508 @@ def parse_cookie_string(cookie_string):
     return cookiejar
 
 
-def refresh_token(exception):
-    session.get(WEREAD_URL)
+# 划线和笔记的增量同步状态: {书籍ID: {"bookmark_synckey", "review_synckey"}}
+# 已同步的划线和笔记（位置和页面ID）记录在台账中
+ANNOTATION_STATE_FILE = "annotation_state.json"
+annotation_state = None
+annotation_state_lock = threading.Lock()
+# 为 True 时忽略保存的 synckey，重新获取全部划线和笔记（--all）
+annotation_full_sync = False
 
 
-@retry(stop_max_attempt_number=3, wait_fixed=5000, retry_on_exception=refresh_token)
-def get_bookmark_list(bookId):
-    """获取我的划线"""
-    session.get(WEREAD_URL)
-    params = dict(bookId=bookId)
-    r = session.get(WEREAD_BOOKMARKLIST_URL, params=params)
-    if r.ok:
-        updated = r.json().get("updated", [])
-        if updated:
-            updated = sorted(
-                updated,
-                key=lambda x: (x.get("chapterUid", 1), int(x.get("range", "0-0").split("-")[0] or 0)),
+def get_annotation_state():
+    """首次使用时读取划线和笔记的增量同步状态"""
+    global annotation_state
+    if annotation_state is None:
+        annotation_state = load_state(ANNOTATION_STATE_FILE, {})
+    return annotation_state
+
+
+def get_annotation_synckey(bookId, name):
+    """一本书划线（bookmark_synckey）或笔记（review_synckey）的 synckey，没有记录或 --all 时为 0"""
+    if annotation_full_sync:
+        return 0
+    return (get_annotation_state().get(bookId) or {}).get(name, 0)
+
+
+def get_annotation_entry(bookId):
+    """获取一本书的增量同步状态：synckey 和台账中已同步的划线、笔记"""
+    entry = get_annotation_state().get(bookId) or {}
+    # 旧版本在增量同步状态中保存划线和笔记的位置，补充到台账中（这本书同步后只保留 synckey）
+    for kind, key in (("bookmark", "bookmarks"), ("review", "reviews")):
+        if entry.get(key):
+            ledger.put_positions(
+                kind,
+                {
+                    annotation_id: (record.get("chapterUid"), record.get("range"))
+                    for annotation_id, record in entry[key].items()
+                },
             )
-        return updated
-    return []
+    return {
+        "bookmark_synckey": get_annotation_synckey(bookId, "bookmark_synckey"),
+        "review_synckey": get_annotation_synckey(bookId, "review_synckey"),
+        "bookmarks": ledger.get_annotations(bookId, "bookmark"),
+        "reviews": ledger.get_annotations(bookId, "review"),
+    }
+
+
+def commit_annotation_entry(bookId, entry, removed_bookmarks=(), removed_reviews=()):
+    """书籍同步成功后保存新的 synckey，并从台账中删除已在微信读书中删除的条目（--plan 时不保存）"""
+    if sync_plan is not None:
+        return
+    ledger.delete("bookmark", removed_bookmarks)
+    ledger.delete("review", removed_reviews)
+    with annotation_state_lock:
+        get_annotation_state()[bookId] = {
+            "bookmark_synckey": entry["bookmark_synckey"],
+            "review_synckey": entry["review_synckey"],
+        }
+        save_state(ANNOTATION_STATE_FILE, annotation_state)
+
+
+def get_removed_annotation_ids(known, changes, id_key, current_ids):
+    """
+    找出已在微信读书中删除的划线/笔记，并从 known 中移除
+    增量请求使用服务端返回的 removed；全量请求时，之前记录过但这次没有返回的也视为删除
+    """
+    removed = {
+        item.get(id_key) if isinstance(item, dict) else item
+        for item in changes.get("removed") or []
+    }
+    if changes["full"]:
+        removed |= set(known) - set(current_ids)
+    removed &= set(known)
+    for annotation_id in removed:
+        known.pop(annotation_id)
+    return removed
+
+
+def sort_bookmarks(bookmarks):
+    """划线按章节和位置排序"""
+    return sorted(
+        bookmarks,
+        key=lambda x: (x.get("chapterUid", 1), int(x.get("range", "0-0").split("-")[0] or 0)),
+    )
+
+
+def check_weread_response(r, name):
+    """
+    请求失败或会话已过期（刷新 Cookie 后仍然失效）时抛出异常，
+    避免把空结果当作同步成功；这本书会记为同步失败，下次运行重试
+    """
+    if not r.ok or is_session_expired(r):
+        raise Exception(f"获取{name}失败: HTTP {r.status_code} {r.text[:200]}")
+
+
+def get_bookmark_changes(bookId, synckey=None):
+    """
+    获取 synckey 之后新增/变化和删除的划线
+    
+    Args:
+        bookId: 书籍ID
+        synckey: 上次返回的 synckey，默认读取增量同步状态，0 表示获取全部
+    
+    Returns:
+        dict: {"updated": 划线列表, "removed": 删除的划线, "synckey": 新的synckey, "full": 是否为全量}
+    """
+    if synckey is None:
+        synckey = get_annotation_synckey(bookId, "bookmark_synckey")
+    params = dict(bookId=bookId, synckey=synckey)
+    r = session.get(WEREAD_BOOKMARKLIST_URL, params=params)
+    check_weread_response(r, "划线")
+    data = r.json()
+    return {
+        "updated": sort_bookmarks(data.get("updated", [])),
+        "removed": data.get("removed", []),
+        "synckey": data.get("synckey", synckey),
+        "full": not synckey,
+    }
 
 
-@retry(stop_max_attempt_number=3, wait_fixed=5000, retry_on_exception=refresh_token)
 def get_read_info(bookId):
-    session.get(WEREAD_URL)
     params = dict(bookId=bookId, readingDetail=1, readingBookIndex=1, finishedDate=1)
     r = session.get(WEREAD_READ_INFO_URL, params=params)
-    if r.ok:
-        return r.json()
-    return None
+    check_weread_response(r, "阅读信息")
+    return r.json()
 
 
-@retry(stop_max_attempt_number=3, wait_fixed=5000, retry_on_exception=refresh_token)
-def get_bookinfo(bookId):
-    """获取书的详情"""
-    session.get(WEREAD_URL)
+# 书籍详情（ISBN、评分、简介）缓存: {书籍ID: {"isbn", "rating", "intro", "fetched_at"}}
+# 超过有效期（天）的条目在下次获取该书数据时重新请求；条目数超过上限时淘汰最早获取的
+BOOKINFO_CACHE_FILE = "bookinfo_cache.json"
+BOOKINFO_CACHE_TTL_DAYS = float(os.getenv("BOOKINFO_CACHE_TTL_DAYS", "30"))
+BOOKINFO_CACHE_MAX_ENTRIES = int(os.getenv("BOOKINFO_CACHE_MAX_ENTRIES", "5000"))
+bookinfo_cache = None
+bookinfo_cache_dirty = False
+bookinfo_cache_lock = threading.Lock()
+
+
+def get_bookinfo_cache():
+    """首次使用时读取本地书籍详情缓存"""
+    global bookinfo_cache
+    if bookinfo_cache is None:
+        bookinfo_cache = load_state(BOOKINFO_CACHE_FILE, {})
+    return bookinfo_cache
+
+
+def is_bookinfo_fresh(bookId, entry):
+    """
+    缓存条目是否仍在有效期内
+    有效期按书籍ID在 75%-100% 之间错开，避免首次全量同步缓存的条目在同一次运行中集中过期
+    """
+    ttl = BOOKINFO_CACHE_TTL_DAYS * 86400
+    spread = int(hashlib.md5(str(bookId).encode("utf-8")).hexdigest()[:4], 16) / 0xFFFF
+    return time.time() - entry.get("fetched_at", 0) < ttl * (0.75 + 0.25 * spread)
+
+
+def save_bookinfo_cache():
+    """有新条目时写回缓存，超过上限时先淘汰最早获取的条目（--plan 时不写入）"""
+    global bookinfo_cache_dirty
+    with bookinfo_cache_lock:
+        if not bookinfo_cache_dirty or sync_plan is not None:
+            return
+        cache = get_bookinfo_cache()
+        overflow = len(cache) - BOOKINFO_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            for bookId in sorted(cache, key=lambda key: cache[key].get("fetched_at", 0))[:overflow]:
+                del cache[bookId]
+        save_state(BOOKINFO_CACHE_FILE, cache)
+        bookinfo_cache_dirty = False
+
+
+# 书籍详情响应中至少要有其中一个字段，否则视为请求失败
+BOOKINFO_FIELDS = ("isbn", "newRating", "intro")
+
+
+def fetch_bookinfo(bookId):
+    """请求书的详情，失败时返回 None（HTTP 200 但带 errcode 或缺少详情字段的响应也视为失败）"""
     params = dict(bookId=bookId)
     r = session.get(WEREAD_BOOK_INFO, params=params)
-    if r.ok:
+    if not r.ok or is_session_expired(r):
+        return None
+    try:
         data = r.json()
-        isbn = data.get("isbn", "")
-        newRating = data.get("newRating", 0) / 100  # 转换为0-10分制
-        intro = data.get("intro", "")
-        return (isbn, newRating, intro)
-    else:
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get("errcode") or not any(key in data for key in BOOKINFO_FIELDS):
+        return None
+    isbn = data.get("isbn", "")
+    newRating = data.get("newRating", 0) / 100  # 转换为0-10分制
+    intro = data.get("intro", "")
+    return (isbn, newRating, intro)
+
+
+def get_bookinfo(bookId):
+    """
+    获取书的详情，优先使用本地缓存，缓存过期或不存在时重新请求
+    请求失败时使用过期的缓存；没有缓存时返回 None，不写入缓存，也不覆盖 Notion 中已有的详情
+    """
+    global bookinfo_cache_dirty
+    with bookinfo_cache_lock:
+        entry = get_bookinfo_cache().get(bookId)
+    if entry is not None and is_bookinfo_fresh(bookId, entry):
+        return (entry["isbn"], entry["rating"], entry["intro"])
+    info = fetch_bookinfo(bookId)
+    if info is None:
         print(f"获取 {bookId} 书籍信息失败")
-        return ("", 0, "")
+        # 请求失败时使用过期的缓存
+        if entry is not None:
+            return (entry["isbn"], entry["rating"], entry["intro"])
+        return None
+    with bookinfo_cache_lock:
+        get_bookinfo_cache()[bookId] = {
+            "isbn": info[0],
+            "rating": info[1],
+            "intro": info[2],
+            "fetched_at": int(time.time()),
+        }
+        bookinfo_cache_dirty = True
+    return info
 
 
-@retry(stop_max_attempt_number=3, wait_fixed=5000, retry_on_exception=refresh_token)
-def get_review_list(bookId):
-    """获取笔记（点评）"""
-    session.get(WEREAD_URL)
-    params = dict(bookId=bookId, listType=11, mine=1, syncKey=0)
+def get_review_changes(bookId, synckey=None):
+    """
+    获取 syncKey 之后新增/变化和删除的笔记（点评）
+    
+    Returns:
+        dict: {"summary": 书评, "notes": 段落笔记, "removed": 删除的笔记ID,
+               "synckey": 新的syncKey, "full": 是否为全量}
+    """
+    if synckey is None:
+        synckey = get_annotation_synckey(bookId, "review_synckey")
+    params = dict(bookId=bookId, listType=11, mine=1, syncKey=synckey)
     r = session.get(WEREAD_REVIEW_LIST_URL, params=params)
-    if r.ok:
-        reviews = r.json().get("reviews", [])
-        # type=4 是书评/点评, type=1 是段落笔记
-        summary = list(filter(lambda x: x.get("review", {}).get("type") == 4, reviews))
-        notes = list(filter(lambda x: x.get("review", {}).get("type") == 1, reviews))
-        notes = list(map(lambda x: x.get("review"), notes))
-        return summary, notes
-    return [], []
+    check_weread_response(r, "笔记")
+    data = r.json()
+    reviews = data.get("reviews", [])
+    # type=4 是书评/点评, type=1 是段落笔记
+    summary = list(filter(lambda x: x.get("review", {}).get("type") == 4, reviews))
+    notes = list(filter(lambda x: x.get("review", {}).get("type") == 1, reviews))
+    notes = list(map(lambda x: x.get("review"), notes))
+    return {
+        "summary": summary,
+        "notes": notes,
+        "removed": data.get("removed", []),
+        "synckey": data.get("syncKey", synckey),
+        "full": not synckey,
+    }
+
+
+# chapterInfos 接口单次请求的书籍数量
+CHAPTER_INFO_BATCH_SIZE = int(os.getenv("CHAPTER_INFO_BATCH_SIZE", "50"))
+# 预先批量获取的章节信息: {书籍ID: {chapterUid: 章节}}
+preloaded_chapter_infos = {}
+# 本地章节缓存: {书籍ID: {"synckey": 服务端返回的synckey, "chapters": {chapterUid: 章节}}}
+CHAPTER_CACHE_FILE = "chapter_cache.json"
+CHAPTER_CACHE_FIELDS = ("chapterUid", "chapterIdx", "title", "level")
+chapter_cache = None
+chapter_cache_lock = threading.Lock()
+
+
+def get_chapter_cache():
+    """首次使用时读取本地章节缓存"""
+    global chapter_cache
+    if chapter_cache is None:
+        chapter_cache = load_state(CHAPTER_CACHE_FILE, {})
+    return chapter_cache
+
+
+def get_cached_chapters(bookId):
+    """从本地缓存读取章节，返回 {chapterUid: 章节} 或 None"""
+    entry = get_chapter_cache().get(bookId)
+    if entry is None:
+        return None
+    return {int(uid): chapter for uid, chapter in entry["chapters"].items()}
+
+
+def merge_chapter_update(bookId, item):
+    """把 chapterInfos 返回的增量（updated/removed）合并进本地缓存"""
+    entry = get_chapter_cache().setdefault(bookId, {"synckey": 0, "chapters": {}})
+    for chapter in item.get("updated", []):
+        entry["chapters"][str(chapter["chapterUid"])] = {
+            field: chapter.get(field) for field in CHAPTER_CACHE_FIELDS
+        }
+    for removed in item.get("removed") or []:
+        uid = removed.get("chapterUid") if isinstance(removed, dict) else removed
+        entry["chapters"].pop(str(uid), None)
+    entry["synckey"] = item.get("synckey", entry["synckey"])
+
+
+def get_chapter_infos(bookIds):
+    """
+    批量获取多本书的章节信息，按 CHAPTER_INFO_BATCH_SIZE 分批请求
+    请求时带上本地缓存的 synckey，服务端只返回之后的变化，合并后写回缓存
+    
+    Returns:
+        dict: {书籍ID: {chapterUid: 章节}}，获取失败且没有缓存的书籍不在结果中
+    """
+    with chapter_cache_lock:
+        cache = get_chapter_cache()
+        for start in range(0, len(bookIds), CHAPTER_INFO_BATCH_SIZE):
+            batch = bookIds[start : start + CHAPTER_INFO_BATCH_SIZE]
+            synckeys = [cache.get(bookId, {}).get("synckey", 0) for bookId in batch]
+            body = {"bookIds": batch, "synckeys": synckeys, "teenmode": 0}
+            r = session.post(WEREAD_CHAPTER_INFO, json=body)
+            if not r.ok:
+                print(f"获取章节信息失败: {r.text}")
+                continue
+            for bookId, item in zip(batch, r.json().get("data", [])):
+                if "updated" in item or "synckey" in item:
+                    merge_chapter_update(str(item.get("bookId", bookId)), item)
+        # --plan 时只在内存中使用获取到的章节，不写回缓存
+        if sync_plan is None:
+            save_state(CHAPTER_CACHE_FILE, cache)
+        result = {}
+        for bookId in bookIds:
+            chapters = get_cached_chapters(bookId)
+            if chapters is not None:
+                result[bookId] = chapters
+        return result
+
+
+def preload_chapter_infos(bookIds):
+    """为即将同步的书籍批量预取章节信息"""
+    with profile_stage("weread_fetch"):
+        preloaded_chapter_infos.update(get_chapter_infos(bookIds))
 
 
-@retry(stop_max_attempt_number=3, wait_fixed=5000, retry_on_exception=refresh_token)
 def get_chapter_info(bookId):
-    """获取章节信息"""
-    session.get(WEREAD_URL)
-    body = {"bookIds": [bookId], "synckeys": [0], "teenmode": 0}
-    r = session.post(WEREAD_CHAPTER_INFO, json=body)
-    if (
-        r.ok
-        and "data" in r.json()
-        and len(r.json()["data"]) == 1
-        and "updated" in r.json()["data"][0]
-    ):
-        update = r.json()["data"][0]["updated"]
-        return {item["chapterUid"]: item for item in update}
-    return None
+    """获取章节信息，优先使用批量预取的结果"""
+    if bookId in preloaded_chapter_infos:
+        return preloaded_chapter_infos.pop(bookId)
+    return get_chapter_infos([bookId]).get(bookId)
+
+
+# 同步一本书需要请求的微信读书接口，彼此独立，可以并发请求
+WEREAD_FETCHERS = {
+    "read_info": get_read_info,
+    "book_info": get_bookinfo,
+    "chapter_info": get_chapter_info,
+    "bookmark_changes": get_bookmark_changes,
+    "review_changes": get_review_changes,
+}
+
+
+def run_fetcher(name, book_id):
+    with profile_stage("weread_fetch"):
+        return WEREAD_FETCHERS[name](book_id)
+
+
+async def fetch_book_data_async(book_id, endpoints, semaphore):
+    """并发请求一本书的多个微信读书接口，返回 {接口名: 原函数返回值}"""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    fetcher = profiler.wrap(run_fetcher) if profiler is not None else run_fetcher
+
+    async def fetch(name):
+        async with semaphore:
+            return await loop.run_in_executor(None, fetcher, name, book_id)
+
+    results = await asyncio.gather(*(fetch(name) for name in endpoints))
+    return dict(zip(endpoints, results))
+
+
+def fetch_books_data(book_ids, endpoints=None, concurrency=None):
+    """
+    并发获取多本书的微信读书数据
+    
+    Args:
+        book_ids: 书籍ID列表
+        endpoints: 需要请求的接口名，默认由 get_fetch_endpoints 按书籍决定
+        concurrency: 同时进行的请求数量上限
+    
+    Returns:
+        dict: {书籍ID: {接口名: 数据}}，某本书获取失败时值为对应的异常
+    """
+    # asyncio 导入较慢，只在确实需要获取书籍数据时导入（笔记本没有变化时不会用到）
+    import asyncio
+
+    async def fetch_all():
+        semaphore = asyncio.Semaphore(concurrency or WEREAD_FETCH_CONCURRENCY)
+        tasks = [
+            fetch_book_data_async(book_id, endpoints or get_fetch_endpoints(book_id), semaphore)
+            for book_id in book_ids
+        ]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return dict(zip(book_ids, results))
+
+    return asyncio.run(fetch_all())
+
+
+def get_fetch_endpoints(book_id):
+    """Notion中已读完的书籍先只获取阅读信息，确定需要同步后再获取其余接口"""
+    if get_book_status(book_id) == "已经读完":
+        return ("read_info",)
+    return tuple(WEREAD_FETCHERS)
+
+
+def query_database_all(database_id, filter=None):
+    """分页读取数据库中的全部页面"""
+    results = []
+    start_cursor = None
+    while True:
+        kwargs = {"database_id": database_id, "page_size": 100}
+        if filter:
+            kwargs["filter"] = filter
+        if start_cursor:
+            kwargs["start_cursor"] = start_cursor
+        response = notion_request(client.databases.query, **kwargs)
+        results.extend(response.get("results", []))
+        if not response.get("has_more"):
+            break
+        start_cursor = response.get("next_cursor")
+    return results
+
+
+def get_page_title(page, name="名称"):
+    """读取页面标题属性的纯文本"""
+    title = page.get("properties", {}).get(name, {}).get("title", [])
+    return "".join(item.get("plain_text", "") for item in title)
+
+
+def get_page_text(page, name):
+    """读取页面文本属性的纯文本"""
+    rich_text = page.get("properties", {}).get(name, {}).get("rich_text", [])
+    return "".join(item.get("plain_text", "") for item in rich_text)
+
+
+def find_page(database_id, filter):
+    """按条件查询一个已存在的页面，返回页面ID或None"""
+    response = notion_request(client.databases.query, database_id=database_id, filter=filter, page_size=1)
+    results = response.get("results", [])
+    return results[0]["id"] if results else None
+
+
+def find_annotation_page(database_id, text, book_page_id):
+    """按规范化名称和关联的书籍查询笔记/划线页面（去重索引之外的单条确认）"""
+    return find_page(
+        database_id,
+        {
+            "and": [
+                {"property": "名称", "title": {"equals": normalize_text_for_title(text)}},
+                {"property": "书籍", "relation": {"contains": book_page_id}},
+            ]
+        },
+    )
+
+
+# 书籍目录，每次运行加载一次: {书籍ID: {"page_id", "status", "progress", "last_edited_time"}}
+book_catalog = {}
+
+
+def load_book_catalog():
+    """分页读取书籍数据库，建立 书籍ID → 页面信息 的目录"""
+    book_catalog.clear()
+    with profile_stage("book_catalog"):
+        pages = query_database_all(BOOK_DATABASE_ID)
+    for page in pages:
+        properties = page.get("properties", {})
+        book_id = get_page_text(page, "书籍ID")
+        if not book_id or book_id in book_catalog:
+            continue
+        status = properties.get("状态", {}).get("status") or {}
+        book_catalog[book_id] = {
+            "page_id": page["id"],
+            "status": status.get("name"),
+            "progress": properties.get("阅读进度", {}).get("number"),
+            "last_edited_time": page.get("last_edited_time"),
+        }
+    print(f"📚 已加载书籍目录: {len(book_catalog)} 本书籍")
+
+
+def update_book_catalog(book_id, page_id, properties, last_edited_time=None):
+    """写入书籍后同步更新书籍目录"""
+    entry = book_catalog.setdefault(book_id, {"page_id": page_id, "status": None, "progress": None})
+    entry["page_id"] = page_id
+    if "状态" in properties:
+        entry["status"] = properties["状态"]["status"]["name"]
+    if "阅读进度" in properties:
+        entry["progress"] = properties["阅读进度"]["number"]
+    entry["last_edited_time"] = last_edited_time
 
 
 def check_book_exists(bookId):
     """检查书籍是否已存在，返回页面ID或None"""
-    # 通过书籍ID字段精确匹配
-    filter = {
-        "property": "书籍ID",
-        "rich_text": {"equals": bookId}
-    }
-    response = client.databases.query(database_id=BOOK_DATABASE_ID, filter=filter)
-    if response.get("results"):
-        return response["results"][0]["id"]
+    entry = book_catalog.get(bookId)
+    if entry:
+        return entry["page_id"]
     return None
 
 
-def get_book_status(book_page_id):
+def get_book_status(bookId):
     """
-    获取书籍在Notion中的状态
+    获取书籍在Notion中的状态（从书籍目录读取）
     
     Args:
-        book_page_id: 书籍页面ID（str）
+        bookId: 微信读书书籍ID（str）
     
     Returns:
-        str or None: 书籍状态（"已经读完"、"正在阅读"、"计划阅读"），如果获取失败返回None
+        str or None: 书籍状态（"已经读完"、"正在阅读"、"计划阅读"），如果没有记录返回None
     """
-    if not book_page_id:
-        return None
-    
-    try:
-        # 获取页面属性
-        page = client.pages.retrieve(page_id=book_page_id)
-        properties = page.get("properties", {})
-        
-        # 获取状态字段
-        status_property = properties.get("状态", {})
-        status = status_property.get("status", {})
-        
-        if status:
-            status_name = status.get("name", "")
-            return status_name
-        
-        return None
-    except Exception as e:
-        # 如果获取失败，记录错误但不影响主流程
-        print(f"    ⚠️  获取书籍状态时出错: {e}")
-        return None
+    entry = book_catalog.get(bookId)
+    if entry:
+        return entry["status"]
+    return None
 
 
 def get_weread_status(read_info):
@@ -260,10 +775,91 @@ def normalize_text_for_title(text):
     return normalized
 
 
+def get_dedup_key(book_page_id, text):
+    """去重索引的键：(书籍页面ID, 规范化后的名称)"""
+    return (book_page_id.replace("-", ""), normalize_text_for_title(text))
+
+
+# 笔记和划线的去重索引: {(书籍页面ID, 规范化名称): 页面ID}
+# 台账中没有记录时才需要查找，所以按书籍在第一次查找时加载；--all 时一次性加载整个数据库
+note_index = {}
+info_index = {}
+# 已加载去重索引的书籍页面ID；dedup_index_full 为 True 时全部书籍都已加载
+dedup_loaded_books = set()
+dedup_index_full = False
+dedup_index_lock = threading.Lock()
+
+
+def build_dedup_index(database_id, book_page_id=None):
+    """
+    分页读取笔记/信息数据库，按 (关联书籍, 规范化名称) 建立索引
+    只读取关联了书籍的页面；指定 book_page_id 时只读取关联了这本书的页面
+    """
+    index = {}
+    if book_page_id:
+        filter = {"property": "书籍", "relation": {"contains": book_page_id}}
+    else:
+        filter = {"property": "书籍", "relation": {"is_not_empty": True}}
+    for page in query_database_all(database_id, filter=filter):
+        title = get_page_title(page)
+        if not normalize_text_for_title(title):
+            continue
+        relation = page.get("properties", {}).get("书籍", {}).get("relation", [])
+        for item in relation:
+            index.setdefault(get_dedup_key(item["id"], title), page["id"])
+    return index
+
+
+def load_dedup_index():
+    """加载全部笔记和划线的去重索引（--all）"""
+    global dedup_index_full
+    with profile_stage("dedup_check"):
+        notes = build_dedup_index(NOTE_DATABASE_ID)
+        infos = build_dedup_index(INFO_DATABASE_ID)
+    with dedup_index_lock:
+        note_index.update(notes)
+        info_index.update(infos)
+        dedup_index_full = True
+    print(f"🗂️  已加载去重索引: {len(note_index)} 条笔记, {len(info_index)} 条划线")
+
+
+def reset_dedup_index():
+    """清空去重索引，之后按书籍重新加载（--daemon 时书籍目录过期后调用）"""
+    global dedup_index_full
+    with dedup_index_lock:
+        note_index.clear()
+        info_index.clear()
+        dedup_loaded_books.clear()
+        dedup_index_full = False
+
+
+def mark_dedup_index_loaded(book_page_id):
+    """本次运行新创建的书籍还没有关联的笔记和划线，不需要查询"""
+    with dedup_index_lock:
+        dedup_loaded_books.add(book_page_id.replace("-", ""))
+
+
+def ensure_book_dedup_index(book_page_id):
+    """第一次查找一本书的笔记或划线时，只查询关联了这本书的页面加入去重索引"""
+    key = book_page_id.replace("-", "")
+    with dedup_index_lock:
+        if dedup_index_full or key in dedup_loaded_books:
+            return
+    with profile_stage("dedup_check"):
+        notes = build_dedup_index(NOTE_DATABASE_ID, book_page_id)
+        infos = build_dedup_index(INFO_DATABASE_ID, book_page_id)
+    with dedup_index_lock:
+        # 本次运行中已写入索引的页面优先
+        for index, loaded in ((note_index, notes), (info_index, infos)):
+            for dedup_key, page_id in loaded.items():
+                index.setdefault(dedup_key, page_id)
+        dedup_loaded_books.add(key)
+
+
 def check_note_exists(note_content, book_page_id):
     """
     严格检查笔记是否已存在
-    通过规范化后的笔记内容（名称）和关联的书籍来判断
+    通过规范化后的笔记内容（名称）和关联的书籍在去重索引中查找
     使用统一的文本规范化处理，确保插入和检查逻辑一致
     
     Args:
@@ -278,46 +874,20 @@ def check_note_exists(note_content, book_page_id):
         return None
     
     # 规范化文本（与insert_note_to_notion保持一致）
-    normalized_title = normalize_text_for_title(note_content)
+    key = get_dedup_key(book_page_id, note_content)
     
     # 如果规范化后为空，说明笔记内容无效，返回None
-    if not normalized_title:
+    if not key[1]:
         return None
     
-    # 复合过滤器：名称精确匹配且关联到同一本书
-    filter_condition = {
-        "and": [
-            {
-                "property": "名称",
-                "title": {"equals": normalized_title}
-            },
-            {
-                "property": "书籍",
-                "relation": {"contains": book_page_id}
-            }
-        ]
-    }
-    
-    try:
-        response = client.databases.query(
-            database_id=NOTE_DATABASE_ID,
-            filter=filter_condition
-        )
-        results = response.get("results", [])
-        if results:
-            # 找到匹配的笔记，返回页面ID
-            return results[0]["id"]
-    except Exception as e:
-        # 如果查询失败，记录错误但不影响主流程
-        print(f"    ⚠️  检查笔记是否存在时出错: {e}")
-    
-    return None
+    ensure_book_dedup_index(book_page_id)
+    return note_index.get(key)
 
 
 def check_info_exists(highlight_text, book_page_id):
     """
     严格检查划线是否已存在
-    通过规范化后的划线文本（名称）和关联的书籍来判断
+    通过规范化后的划线文本（名称）和关联的书籍在去重索引中查找
     避免不同书籍有相同划线文本时误判
     使用统一的文本规范化处理，确保插入和检查逻辑一致
     
@@ -333,40 +903,14 @@ def check_info_exists(highlight_text, book_page_id):
         return None
     
     # 规范化文本（与insert_highlight_to_info保持一致）
-    normalized_title = normalize_text_for_title(highlight_text)
+    key = get_dedup_key(book_page_id, highlight_text)
     
     # 如果规范化后为空，说明划线文本无效，返回None
-    if not normalized_title:
+    if not key[1]:
         return None
     
-    # 复合过滤器：名称精确匹配且关联到同一本书
-    filter_condition = {
-        "and": [
-            {
-                "property": "名称",
-                "title": {"equals": normalized_title}
-            },
-            {
-                "property": "书籍",
-                "relation": {"contains": book_page_id}
-            }
-        ]
-    }
-    
-    try:
-        response = client.databases.query(
-            database_id=INFO_DATABASE_ID,
-            filter=filter_condition
-        )
-        results = response.get("results", [])
-        if results:
-            # 找到匹配的划线，返回页面ID
-            return results[0]["id"]
-    except Exception as e:
-        # 如果查询失败，记录错误但不影响主流程
-        print(f"    ⚠️  检查划线是否存在时出错: {e}")
-    
-    return None
+    ensure_book_dedup_index(book_page_id)
+    return info_index.get(key)
 
 
 def extract_reading_progress(read_info):
@@ -404,7 +948,22 @@ def extract_reading_progress(read_info):
     return None
 
 
-def insert_book_to_notion(book_name, book_id, cover, author, isbn, rating, intro, read_info):
+# 页面图标和封面在属性哈希中使用的字段名
+PAGE_ICON_FIELD = "__icon__"
+
+
+def get_property_fingerprints(properties, icon=None):
+    """计算每个属性（以及图标/封面）的哈希，用于跳过没有变化的写入"""
+    fingerprints = {
+        name: get_content_hash(json.dumps(value, ensure_ascii=False, sort_keys=True))
+        for name, value in properties.items()
+    }
+    if icon is not None:
+        fingerprints[PAGE_ICON_FIELD] = get_content_hash(json.dumps(icon, sort_keys=True))
+    return fingerprints
+
+
+def insert_book_to_notion(book_name, book_id, cover, author, isbn, rating, intro, read_info, children=None):
     """
     插入书籍到书籍数据库
     字段映射:
@@ -420,6 +979,8 @@ def insert_book_to_notion(book_name, book_id, cover, author, isbn, rating, intro
     - 添加日期 (date) ← 当前日期
     - 读完日期 (date) ← finishedDate
     - 阅读进度 (number) ← percentage (0-1)
+    
+    children 为页面内容（可选），随创建请求一起发送
     """
     if not cover or not cover.startswith("http"):
         cover = "https://www.notion.so/icons/book_gray.svg"
@@ -468,7 +1029,10 @@ def insert_book_to_notion(book_name, book_id, cover, author, isbn, rating, intro
         properties["状态"] = get_status("计划阅读")
     
     icon = get_icon(cover)
-    response = client.pages.create(parent=parent, icon=icon, cover=icon, properties=properties)
+    response = create_page(parent=parent, icon=icon, cover=icon, properties=properties, children=children)
+    ledger.put_fingerprints(response["id"], get_property_fingerprints(properties, icon))
+    update_book_catalog(book_id, response["id"], properties, response.get("last_edited_time"))
+    mark_dedup_index_loaded(response["id"])
     return response["id"]
 
 
@@ -482,12 +1046,15 @@ def update_book_in_notion(page_id, book_name, book_id, cover, author, isbn, rati
     properties = {
         "名称": get_title(book_name),
         "书籍作者": get_rich_text(author or ""),
-        "书籍简介": get_rich_text(intro or ""),
         "书籍ID": get_rich_text(book_id),
         "书籍链接": get_url(weread_url),
         "书籍封面": get_file(cover),
     }
     
+    # 书籍详情获取失败（intro 为 None）时不覆盖已有的简介
+    if intro is not None:
+        properties["书籍简介"] = get_rich_text(intro)
+    
     # ISBN
     if isbn:
         properties["ISBN"] = get_rich_text(isbn)
@@ -511,10 +1078,67 @@ def update_book_in_notion(page_id, book_name, book_id, cover, author, isbn, rati
             properties["阅读进度"] = get_number(reading_progress)
     
     icon = get_icon(cover)
-    client.pages.update(page_id=page_id, icon=icon, cover=icon, properties=properties)
+    fingerprints = get_property_fingerprints(properties, icon)
+    last_fingerprints = ledger.get_fingerprints(page_id)
+    changed = {
+        name: value for name, value in properties.items()
+        if fingerprints[name] != last_fingerprints.get(name)
+    }
+    icon_changed = fingerprints[PAGE_ICON_FIELD] != last_fingerprints.get(PAGE_ICON_FIELD)
+    if not changed and not icon_changed:
+        print(f"    ⏭️  书籍属性没有变化，跳过更新")
+        record_plan_skip("书籍", book_name)
+        return page_id
+    
+    # 只发送变化的属性，图标和封面没变时不再重复发送
+    kwargs = {"page_id": page_id, "properties": changed}
+    if icon_changed:
+        kwargs["icon"] = icon
+        kwargs["cover"] = icon
+    response = notion_request(client.pages.update, **kwargs)
+    ledger.put_fingerprints(page_id, fingerprints)
+    update_book_catalog(book_id, page_id, properties, response.get("last_edited_time"))
     return page_id
 
 
+def get_note_children(note_content, chapter_title=None):
+    """笔记页面内容：章节标题 + 分段的完整笔记"""
+    children = []
+    if note_content:
+        if chapter_title:
+            children.append(get_heading(3, f"章节：{chapter_title}"))
+        
+        # 分段添加内容
+        for i in range(0, len(note_content), 2000):
+            children.append({
+                "type": "paragraph",
+                "paragraph": {
+                    "rich_text": [{"type": "text", "text": {"content": note_content[i:i+2000]}}]
+                }
+            })
+    return children
+
+
+def get_highlight_children(highlight_text, book_name, chapter_title=None):
+    """划线页面内容：来源标题 + 分段的完整划线"""
+    children = []
+    if chapter_title:
+        children.append(get_heading(3, f"来源：{book_name} - {chapter_title}"))
+    else:
+        children.append(get_heading(3, f"来源：{book_name}"))
+    
+    # 分段添加划线内容
+    for i in range(0, len(highlight_text), 2000):
+        children.append({
+            "type": "quote",
+            "quote": {
+                "rich_text": [{"type": "text", "text": {"content": highlight_text[i:i+2000]}}],
+                "color": "default"
+            }
+        })
+    return children
+
+
 def insert_note_to_notion(note_content, book_page_id, chapter_title=None):
     """
     插入笔记到笔记数据库
@@ -553,26 +1177,12 @@ def insert_note_to_notion(note_content, book_page_id, chapter_title=None):
     if book_page_id:
         properties["书籍"] = get_relation([book_page_id])
     
-    response = client.pages.create(parent=parent, properties=properties)
+    # 完整内容作为页面内容，随创建请求一起发送
+    children = get_note_children(note_content, chapter_title)
+    response = create_page(parent=parent, properties=properties, children=children)
     note_page_id = response["id"]
-    
-    # 添加完整内容到页面内容中
-    if note_content:
-        children = []
-        if chapter_title:
-            children.append(get_heading(3, f"章节：{chapter_title}"))
-        
-        # 分段添加内容
-        for i in range(0, len(note_content), 2000):
-            children.append({
-                "type": "paragraph",
-                "paragraph": {
-                    "rich_text": [{"type": "text", "text": {"content": note_content[i:i+2000]}}]
-                }
-            })
-        
-        if children:
-            add_children(note_page_id, children)
+    # 加入去重索引，本次运行后续的检查可以直接命中
+    note_index[get_dedup_key(book_page_id, title)] = note_page_id
     
     return note_page_id
 
@@ -623,56 +1233,114 @@ def insert_highlight_to_info(highlight_text, book_name, book_url, book_page_id,
     
     # 关联笔记
     if note_page_ids:
-        properties["笔记"] = get_relation(note_page_ids)
+        properties["笔记"] = get_note_relation(note_page_ids)
     
     # 关联书籍（双向关联，信息库字段名"书籍"，书籍库反向字段名"信息"）
     if book_page_id:
         properties["书籍"] = get_relation([book_page_id])
     
-    response = client.pages.create(parent=parent, properties=properties)
+    # 完整内容作为页面内容，随创建请求一起发送
+    children = get_highlight_children(highlight_text, book_name, chapter_title)
+    response = create_page(parent=parent, properties=properties, children=children)
     info_page_id = response["id"]
-    
-    # 添加完整内容到页面
-    children = []
-    if chapter_title:
-        children.append(get_heading(3, f"来源：{book_name} - {chapter_title}"))
-    else:
-        children.append(get_heading(3, f"来源：{book_name}"))
-    
-    # 分段添加划线内容
-    for i in range(0, len(highlight_text), 2000):
-        children.append({
-            "type": "quote",
-            "quote": {
-                "rich_text": [{"type": "text", "text": {"content": highlight_text[i:i+2000]}}],
-                "color": "default"
-            }
-        })
-    
-    if children:
-        add_children(info_page_id, children)
+    # 加入去重索引，本次运行后续的检查可以直接命中
+    info_index[get_dedup_key(book_page_id, title)] = info_page_id
     
     return info_page_id
 
 
+# Notion 单个关联属性一次最多写入的页面数量
+MAX_RELATIONS_PER_REQUEST = 100
+
+
+def get_note_relation(note_page_ids):
+    """
+    划线关联的笔记
+    更新关联属性会整体替换原有的值，无法分批追加，超过上限的部分只能舍弃
+    """
+    if len(note_page_ids) > MAX_RELATIONS_PER_REQUEST:
+        print(f"    ⚠️ 关联笔记 {len(note_page_ids)} 条，超过 Notion 上限，只保留前 {MAX_RELATIONS_PER_REQUEST} 条")
+        note_page_ids = note_page_ids[:MAX_RELATIONS_PER_REQUEST]
+    return get_relation(note_page_ids)
+
+
+def update_highlight_notes(page_id, note_page_ids):
+    """更新已有划线关联的笔记（之后新增了位置重叠的笔记）"""
+    notion_request(client.pages.update, page_id=page_id, properties={"笔记": get_note_relation(note_page_ids)})
+
+
+def update_note_in_notion(page_id, note_content, book_page_id, chapter_title=None):
+    """在微信读书中编辑过的笔记：原地更新已有页面的名称和内容"""
+    title = normalize_text_for_title(note_content)
+    if not title:
+        raise ValueError("笔记内容规范化后为空，无法更新笔记")
+    notion_request(client.pages.update, page_id=page_id, properties={"名称": get_title(title)})
+    replace_children(page_id, get_note_children(note_content, chapter_title))
+    note_index[get_dedup_key(book_page_id, title)] = page_id
+    return page_id
+
+
+def update_highlight_in_info(page_id, highlight_text, book_name, book_page_id, chapter_title=None):
+    """在微信读书中编辑过的划线：原地更新已有页面的名称和内容"""
+    title = normalize_text_for_title(highlight_text)
+    if not title:
+        raise ValueError("划线文本规范化后为空，无法更新划线")
+    notion_request(client.pages.update, page_id=page_id, properties={"名称": get_title(title)})
+    replace_children(page_id, get_highlight_children(highlight_text, book_name, chapter_title))
+    info_index[get_dedup_key(book_page_id, title)] = page_id
+    return page_id
+
+
+# Notion 单次请求最多携带的子块数量
+MAX_CHILDREN_PER_REQUEST = 100
+
+
+def create_page(children=None, **kwargs):
+    """创建页面，前100个子块随创建请求一起发送，超出部分再追加"""
+    children = children or []
+    if children:
+        kwargs["children"] = children[:MAX_CHILDREN_PER_REQUEST]
+    response = notion_request(client.pages.create, **kwargs)
+    if len(children) > MAX_CHILDREN_PER_REQUEST:
+        add_children(response["id"], children[MAX_CHILDREN_PER_REQUEST:])
+    return response
+
+
 def add_children(id, children):
     """添加子块到页面"""
     results = []
-    for i in range(0, len(children) // 100 + 1):
-        batch = children[i * 100 : (i + 1) * 100]
+    for i in range(0, len(children) // MAX_CHILDREN_PER_REQUEST + 1):
+        batch = children[i * MAX_CHILDREN_PER_REQUEST : (i + 1) * MAX_CHILDREN_PER_REQUEST]
         if not batch:
             continue
-        time.sleep(0.3)
-        response = client.blocks.children.append(block_id=id, children=batch)
+        response = notion_request(client.blocks.children.append, block_id=id, children=batch)
         results.extend(response.get("results", []))
     return results
 
 
+def replace_children(id, children):
+    """删除页面已有的子块，再写入新的子块"""
+    block_ids = []
+    start_cursor = None
+    while True:
+        kwargs = {"block_id": id, "page_size": 100}
+        if start_cursor:
+            kwargs["start_cursor"] = start_cursor
+        response = notion_request(client.blocks.children.list, **kwargs)
+        block_ids.extend(block["id"] for block in response.get("results", []))
+        if not response.get("has_more"):
+            break
+        start_cursor = response.get("next_cursor")
+    for block_id in block_ids:
+        notion_request(client.blocks.delete, block_id=block_id)
+    return add_children(id, children)
+
+
 def get_notebooklist():
     """获取笔记本列表"""
-    session.get(WEREAD_URL)
-    r = session.get(WEREAD_NOTEBOOKS_URL)
-    if r.ok:
+    with profile_stage("notebook_fetch"):
+        r = session.get(WEREAD_NOTEBOOKS_URL)
+    if r.ok and not is_session_expired(r):
         data = r.json()
         books = data.get("books", [])
         books.sort(key=lambda x: x["sort"])
@@ -682,6 +1350,48 @@ def get_notebooklist():
     return None
 
 
+def get_book_fingerprint(book_data):
+    """笔记本列表中一本书的指纹：更新时间和划线/笔记/点评数量"""
+    return {
+        "sort": book_data.get("sort"),
+        "noteCount": book_data.get("noteCount"),
+        "bookmarkCount": book_data.get("bookmarkCount"),
+        "reviewCount": book_data.get("reviewCount"),
+    }
+
+
+def is_book_changed(book_data, sync_state):
+    """与上次同步成功时的指纹比较，判断书籍是否有变化"""
+    book_id = book_data.get("book", {}).get("bookId")
+    return sync_state["books"].get(book_id) != get_book_fingerprint(book_data)
+
+
+def mark_book_synced(book_data, sync_state):
+    """记录书籍同步成功时的指纹并立即写入状态文件（--plan 时不记录）"""
+    if sync_plan is not None:
+        return
+    book_id = book_data.get("book", {}).get("bookId")
+    sync_state["books"][book_id] = get_book_fingerprint(book_data)
+    save_state(SYNC_STATE_FILE, sync_state)
+    journal.complete_book(book_id)
+
+
+def get_notebook_fingerprint(books):
+    """整个笔记本列表的指纹（每本书的指纹按书籍ID排序后取哈希）"""
+    fingerprints = sorted(
+        (book_data.get("book", {}).get("bookId"), get_book_fingerprint(book_data)) for book_data in books
+    )
+    return hashlib.sha256(json.dumps(fingerprints, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def mark_notebook_synced(fingerprint, sync_state):
+    """记录整个笔记本列表的指纹；有书籍同步失败时传入 None 清除（--plan 时不记录）"""
+    if sync_plan is not None or sync_state.get("notebook") == fingerprint:
+        return
+    sync_state["notebook"] = fingerprint
+    save_state(SYNC_STATE_FILE, sync_state)
+
+
 def transform_id(book_id):
     id_length = len(book_id)
 
@@ -730,7 +1440,7 @@ def try_get_cloud_cookie(url, id, password):
     req_url = f"{url}/get/{id}"
     data = {"password": password}
     result = None
-    response = requests.post(req_url, data=data)
+    response = requests.post(req_url, data=data, timeout=COOKIECLOUD_TIMEOUT)
     if response.status_code == 200:
         data = response.json()
         cookie_data = data.get("cookie_data")
@@ -743,22 +1453,226 @@ def try_get_cloud_cookie(url, id, password):
     return result
 
 
-def get_cookie():
+# 本次启动时从本地缓存读取的 Cookie，没有变化时不重复写入
+cached_cookie = None
+
+
+def start_cloud_cookie_fetch(url, id, password):
+    """在后台线程请求 CookieCloud，返回 Future"""
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(try_get_cloud_cookie(url, id, password))
+        except Exception as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="cookiecloud", daemon=True).start()
+    return future
+
+
+def wait_cloud_cookie(future):
+    """等待 CookieCloud 的结果，超时或失败时返回 None"""
+    try:
+        return future.result(timeout=COOKIECLOUD_TIMEOUT)
+    except Exception as e:
+        print(f"⚠️  从 CookieCloud 获取 Cookie 失败: {str(e) or '超时'}")
+        return None
+
+
+def get_cloud_config():
+    """CookieCloud 配置 (url, id, password)，没有配置时返回 None"""
     url = os.getenv("CC_URL")
     if not url:
         url = "https://cookiecloud.malinkang.com/"
     id = os.getenv("CC_ID")
     password = os.getenv("CC_PASSWORD")
-    cookie = os.getenv("WEREAD_COOKIE")
     if url and id and password:
-        cookie = try_get_cloud_cookie(url, id, password)
+        return url, id, password
+    return None
+
+
+def get_cookie():
+    """
+    获取微信读书 Cookie
+    配置了 CookieCloud 时在后台请求 CookieCloud，同时优先使用本地缓存中上次验证有效的 Cookie，
+    没有缓存时才等待 CookieCloud 的结果
+
+    Returns:
+        tuple: (Cookie, CookieCloud 请求的 Future)，没有配置 CookieCloud 时 Future 为 None
+    """
+    global cached_cookie
+    cloud_config = get_cloud_config()
+    cookie = os.getenv("WEREAD_COOKIE")
+    cloud_cookie = None
+    if cloud_config:
+        cloud_cookie = start_cloud_cookie_fetch(*cloud_config)
+        cached_cookie = load_cached_cookie(cloud_config[2])
+        cookie = cached_cookie or wait_cloud_cookie(cloud_cookie) or cookie
     if not cookie or not cookie.strip():
         raise Exception("没有找到cookie，请按照文档填写cookie")
-    return cookie
+    return cookie, cloud_cookie
+
+
+def ensure_valid_cookie(cookie, cloud_cookie):
+    """
+    用笔记本列表请求验证 Cookie：缓存的 Cookie 失效时改用 CookieCloud 的 Cookie 再试一次，
+    验证有效的 Cookie 加密写入本地缓存
+
+    Returns:
+        list or None: 笔记本列表
+    """
+    books = get_notebooklist()
+    if cloud_cookie is None:
+        return books
+    if books is None:
+        new_cookie = wait_cloud_cookie(cloud_cookie)
+        if not new_cookie or new_cookie == cookie:
+            return None
+        print("🍪 缓存的 Cookie 已失效，改用 CookieCloud 中的 Cookie")
+        session.reset(parse_cookie_string(new_cookie))
+        books = get_notebooklist()
+    if books is not None and sync_plan is None and session.get_cookie_string() != cached_cookie:
+        save_cached_cookie(session.get_cookie_string(), os.getenv("CC_PASSWORD"))
+    return books
+
+
+def sync_note_page(review, book_id, book_page_id, chapter_title=None):
+    """
+    同步一条笔记：先查本地台账，再查去重索引，都没有时创建
+    台账中内容哈希不同说明笔记在微信读书中被编辑过，原地更新已有页面
+    
+    Returns:
+        tuple: (笔记页面ID, 动作) 动作为 "created"、"updated" 或 "existing"
+    """
+    content = review.get("content", "")
+    review_id = review.get("reviewId")
+    content_hash = get_content_hash(content)
+    with profile_stage("dedup_check"):
+        record = ledger.get("review", review_id) if review_id else None
+    if record:
+        page_id, old_hash = record
+        if old_hash == content_hash:
+            record_plan_skip("笔记", normalize_text_for_title(content)[:50])
+            return page_id, "existing"
+        journal.plan(book_id, "review", review_id, "update", content_hash)
+        update_note_in_notion(page_id, content, book_page_id, chapter_title=chapter_title)
+        action = "updated"
+    else:
+        # 严格检查笔记是否已存在（通过规范化内容和书籍关联）
+        with profile_stage("dedup_check"):
+            page_id = check_note_exists(content, book_page_id)
+            if not page_id and review_id and journal.is_in_doubt("review", review_id):
+                # 上次运行在创建这条笔记时中途退出，先确认页面是否已经创建
+                page_id = find_annotation_page(NOTE_DATABASE_ID, content, book_page_id)
+                journal.resolve("review", review_id)
+        action = "existing"
+        if page_id:
+            record_plan_skip("笔记", normalize_text_for_title(content)[:50])
+        else:
+            if review_id:
+                journal.plan(book_id, "review", review_id, "create", content_hash)
+            page_id = insert_note_to_notion(content, book_page_id, chapter_title=chapter_title)
+            action = "created"
+    if review_id:
+        journal.commit(book_id, "review", review_id, page_id, content_hash)
+        ledger.put(
+            "review", review_id, book_id, page_id, content_hash,
+            chapter_uid=review.get("chapterUid"), mark_range=review.get("range"),
+        )
+    return page_id, action
+
+
+def sync_highlight_page(bookmark, book_id, book_name, book_url, book_page_id, note_page_ids=None, chapter_title=None):
+    """
+    同步一条划线：先查本地台账，再查去重索引，都没有时创建
+    
+    Returns:
+        tuple: (划线页面ID, 动作) 动作为 "created"、"updated" 或 "existing"
+    """
+    mark_text = bookmark.get("markText", "")
+    bookmark_id = bookmark.get("bookmarkId")
+    content_hash = get_content_hash(mark_text)
+    with profile_stage("dedup_check"):
+        record = ledger.get("bookmark", bookmark_id) if bookmark_id else None
+    if record:
+        page_id, old_hash = record
+        if old_hash == content_hash:
+            record_plan_skip("信息", normalize_text_for_title(mark_text)[:50])
+            return page_id, "existing"
+        journal.plan(book_id, "bookmark", bookmark_id, "update", content_hash)
+        update_highlight_in_info(page_id, mark_text, book_name, book_page_id, chapter_title=chapter_title)
+        action = "updated"
+    else:
+        # 严格检查是否已存在（通过规范化文本和关联的书籍）
+        with profile_stage("dedup_check"):
+            page_id = check_info_exists(mark_text, book_page_id)
+            if not page_id and bookmark_id and journal.is_in_doubt("bookmark", bookmark_id):
+                # 上次运行在创建这条划线时中途退出，先确认页面是否已经创建
+                page_id = find_annotation_page(INFO_DATABASE_ID, mark_text, book_page_id)
+                journal.resolve("bookmark", bookmark_id)
+        action = "existing"
+        if page_id:
+            record_plan_skip("信息", normalize_text_for_title(mark_text)[:50])
+        else:
+            if bookmark_id:
+                journal.plan(book_id, "bookmark", bookmark_id, "create", content_hash)
+            page_id = insert_highlight_to_info(
+                mark_text, book_name, book_url, book_page_id,
+                note_page_ids=note_page_ids,
+                chapter_title=chapter_title
+            )
+            action = "created"
+    if bookmark_id:
+        journal.commit(book_id, "bookmark", bookmark_id, page_id, content_hash)
+        ledger.put(
+            "bookmark", bookmark_id, book_id, page_id, content_hash,
+            chapter_uid=bookmark.get("chapterUid", 1), mark_range=bookmark.get("range"),
+        )
+    return page_id, action
+
 
+def get_note_intervals(reviews):
+    """由增量同步状态中的笔记建立 章节+range → 笔记页面ID 的区间索引（书评没有 range，不参与关联）"""
+    intervals = IntervalIndex()
+    for record in reviews.values():
+        if record.get("page_id"):
+            intervals.add(record.get("chapterUid"), record.get("range"), record["page_id"])
+    return intervals
 
-def sync_book(book_data):
-    """同步单本书籍及其划线、笔记"""
+
+def relink_highlights(annotation_entry, created_notes, note_intervals, skip_bookmark_ids=()):
+    """
+    为与新增笔记位置重叠的已有划线更新笔记关联
+    
+    Returns:
+        int: 更新的划线数量
+    """
+    if not created_notes:
+        return 0
+    bookmark_intervals = IntervalIndex()
+    for bookmark_id, record in annotation_entry["bookmarks"].items():
+        if record.get("page_id") and bookmark_id not in skip_bookmark_ids:
+            bookmark_intervals.add(record.get("chapterUid"), record.get("range"), bookmark_id)
+    bookmark_ids = []
+    for note in created_notes:
+        for bookmark_id in bookmark_intervals.query(note.get("chapterUid"), note.get("range")):
+            if bookmark_id not in bookmark_ids:
+                bookmark_ids.append(bookmark_id)
+    for bookmark_id in bookmark_ids:
+        record = annotation_entry["bookmarks"][bookmark_id]
+        update_highlight_notes(record["page_id"], note_intervals.query(record.get("chapterUid"), record.get("range")))
+    return len(bookmark_ids)
+
+
+def sync_book(book_data, fetched=None):
+    """
+    同步单本书籍及其划线、笔记
+    
+    Args:
+        book_data: 笔记本列表中的书籍数据（dict）
+        fetched: fetch_books_data 预先获取的微信读书数据（dict，可选）
+    """
     book = book_data.get("book")
     title = book.get("title")
     cover = book.get("cover", "").replace("/s_", "/t7_")
@@ -769,97 +1683,145 @@ def sync_book(book_data):
     
     # 检查书籍是否已存在
     existing_book_id = check_book_exists(book_id)
+    if not existing_book_id and journal.is_in_doubt("book", book_id):
+        # 上次运行在创建这本书时中途退出，先确认页面是否已经创建
+        existing_book_id = find_page(BOOK_DATABASE_ID, {"property": "书籍ID", "rich_text": {"equals": book_id}})
+        journal.resolve("book", book_id)
+    
+    # 获取微信读书数据（未预先获取时在这里并发请求）
+    if fetched is None:
+        fetched = fetch_books_data([book_id])[book_id]
+    if isinstance(fetched, Exception):
+        raise fetched
     
     # 获取微信读书的阅读信息
-    read_info = get_read_info(book_id)
+    read_info = fetched["read_info"]
     weread_status = get_weread_status(read_info)
     
     # 如果书籍已存在，检查微信读书和Notion的状态
     if existing_book_id:
-        notion_status = get_book_status(existing_book_id)
+        notion_status = get_book_status(book_id)
         
         # 只有当微信读书和Notion的状态都是"已经读完"时，才跳过同步
         if weread_status == "已经读完" and notion_status == "已经读完":
             print(f"    ⏭️  微信读书和Notion状态均为「已经读完」，跳过同步")
+            record_plan_skip("书籍", title)
             return existing_book_id
     
-    # 获取书籍详情（只有在需要同步时才获取）
-    isbn, rating, intro = get_bookinfo(book_id)
+    # 补齐预先获取时没有请求的接口（只有在需要同步时才获取）
+    missing = [name for name in WEREAD_FETCHERS if name not in fetched]
+    if missing:
+        extra = fetch_books_data([book_id], endpoints=missing)[book_id]
+        if isinstance(extra, Exception):
+            raise extra
+        fetched = {**fetched, **extra}
+    
+    # 获取书籍详情
+    # 书籍详情获取失败时 intro 为 None，更新书籍时保留 Notion 中已有的简介
+    isbn, rating, intro = fetched["book_info"] or ("", 0, None)
     
     # 更新或创建书籍
     if existing_book_id:
         print(f"    ✓ 书籍已存在，更新中...")
+        journal.plan(book_id, "book", book_id, "update")
         book_page_id = update_book_in_notion(
             existing_book_id, title, book_id, cover, author, isbn, rating, intro, read_info
         )
     else:
         print(f"    + 创建新书籍...")
+        journal.plan(book_id, "book", book_id, "create")
         book_page_id = insert_book_to_notion(
             title, book_id, cover, author, isbn, rating, intro, read_info
         )
     
+    journal.commit(book_id, "book", book_id, book_page_id)
+    ledger.put("book", book_id, book_id, book_page_id)
+    
     # 构建微信读书链接
     book_url = f"https://weread.qq.com/web/reader/{calculate_book_str_id(book_id)}"
     
     # 获取章节信息
-    chapter_info = get_chapter_info(book_id)
+    chapter_info = fetched["chapter_info"]
     
-    # 获取划线列表
-    bookmark_list = get_bookmark_list(book_id)
-    print(f"    📝 发现 {len(bookmark_list)} 条划线")
+    # 获取划线列表（增量同步时只包含上次同步后新增或变化的划线）
+    bookmark_changes = fetched["bookmark_changes"]
+    bookmark_list = bookmark_changes["updated"]
+    print(f"    📝 发现 {len(bookmark_list)} 条{'' if bookmark_changes['full'] else '新增或变化的'}划线")
     
     # 获取笔记（点评）
-    summary, notes = get_review_list(book_id)
-    print(f"    ✍️ 发现 {len(notes)} 条笔记, {len(summary)} 条书评")
+    review_changes = fetched["review_changes"]
+    summary, notes = review_changes["summary"], review_changes["notes"]
+    print(f"    ✍️ 发现 {len(notes)} 条{'' if review_changes['full'] else '新增或变化的'}笔记, {len(summary)} 条书评")
+    
+    # 上次同步的状态，用于发现已删除的划线和笔记
+    annotation_entry = get_annotation_entry(book_id)
+    annotation_entry["bookmark_synckey"] = bookmark_changes["synckey"]
+    annotation_entry["review_synckey"] = review_changes["synckey"]
+    removed_bookmarks = get_removed_annotation_ids(
+        annotation_entry["bookmarks"], bookmark_changes, "bookmarkId",
+        [bookmark.get("bookmarkId") for bookmark in bookmark_list],
+    )
+    removed_reviews = get_removed_annotation_ids(
+        annotation_entry["reviews"], review_changes, "reviewId",
+        [item.get("review", {}).get("reviewId") for item in summary]
+        + [note.get("reviewId") for note in notes],
+    )
+    if removed_bookmarks or removed_reviews:
+        print(f"    🗑️  微信读书中已删除 {len(removed_bookmarks)} 条划线, {len(removed_reviews)} 条笔记（Notion 中的页面保留）")
     
     # 创建笔记页面（用于关联划线）
-    note_page_ids = []
     note_count = 0
+    updated_note_count = 0
+    # 本次新增的笔记，之前同步过的、位置重叠的划线需要补充关联
+    created_notes = []
+    
+    def record_review(review, page_id):
+        review_id = review.get("reviewId")
+        if review_id:
+            annotation_entry["reviews"][review_id] = {
+                "chapterUid": review.get("chapterUid"),
+                "range": review.get("range"),
+                "page_id": page_id,
+            }
     
     # 处理书评（summary）- 作为笔记
     for item in summary:
         review = item.get("review", {})
-        content = review.get("content", "")
-        if content:
-            # 严格检查笔记是否已存在（通过规范化内容和书籍关联）
-            existing_note_id = check_note_exists(content, book_page_id)
-            if existing_note_id:
-                # 已存在的笔记，添加到关联列表但不再创建
-                note_page_ids.append(existing_note_id)
-                continue
-            
-            # 确认不存在，创建新笔记
-            print(f"    + 添加书评笔记...")
-            note_id = insert_note_to_notion(content, book_page_id, chapter_title="书评")
-            note_page_ids.append(note_id)
-            note_count += 1
-            time.sleep(0.3)
+        if review.get("content", ""):
+            note_id, action = sync_note_page(review, book_id, book_page_id, chapter_title="书评")
+            record_review(review, note_id)
+            if action == "created":
+                print(f"    + 添加书评笔记...")
+                note_count += 1
+            elif action == "updated":
+                print(f"    ✎ 更新已编辑的书评...")
+                updated_note_count += 1
     
     # 处理段落笔记 - 作为笔记
     for note in notes:
-        content = note.get("content", "")
         chapter_uid = note.get("chapterUid", 1)
         chapter_title = None
         if chapter_info and chapter_uid in chapter_info:
             chapter_title = chapter_info[chapter_uid].get("title", "")
         
-        if content:
-            # 严格检查笔记是否已存在（通过规范化内容和书籍关联）
-            existing_note_id = check_note_exists(content, book_page_id)
-            if existing_note_id:
-                # 已存在的笔记，添加到关联列表但不再创建
-                note_page_ids.append(existing_note_id)
-                continue
-            
-            # 确认不存在，创建新笔记
-            print(f"    + 添加段落笔记...")
-            note_id = insert_note_to_notion(content, book_page_id, chapter_title=chapter_title)
-            note_page_ids.append(note_id)
-            note_count += 1
-            time.sleep(0.3)
+        if note.get("content", ""):
+            note_id, action = sync_note_page(note, book_id, book_page_id, chapter_title=chapter_title)
+            record_review(note, note_id)
+            if action == "created":
+                print(f"    + 添加段落笔记...")
+                note_count += 1
+                created_notes.append(note)
+            elif action == "updated":
+                print(f"    ✎ 更新已编辑的笔记...")
+                updated_note_count += 1
+    
+    # 划线只关联位置重叠的笔记（同一章节、range 有交集），包括之前同步过的笔记
+    note_intervals = get_note_intervals(annotation_entry["reviews"])
+    created_bookmark_ids = set()
     
     # 处理划线 - 作为信息
     highlight_count = 0
+    updated_highlight_count = 0
     skipped_count = 0
     for bookmark in bookmark_list:
         mark_text = bookmark.get("markText", "")
@@ -871,35 +1833,53 @@ def sync_book(book_data):
         if chapter_info and chapter_uid in chapter_info:
             chapter_title = chapter_info[chapter_uid].get("title", "")
         
-        # 严格检查是否已存在（通过规范化文本和关联的书籍）
-        existing_info_id = check_info_exists(mark_text, book_page_id)
-        if existing_info_id:
+        info_page_id, action = sync_highlight_page(
+            bookmark, book_id, title, book_url, book_page_id,
+            note_page_ids=note_intervals.query(chapter_uid, bookmark.get("range")) or None,
+            chapter_title=chapter_title
+        )
+        if action == "created":
+            print(f"    + 添加划线到信息库...")
+            highlight_count += 1
+            created_bookmark_ids.add(bookmark.get("bookmarkId"))
+        elif action == "updated":
+            print(f"    ✎ 更新已编辑的划线...")
+            updated_highlight_count += 1
+        else:
             # 已存在的划线，跳过
             skipped_count += 1
-            continue
         
-        # 确认不存在，创建新划线
-        print(f"    + 添加划线到信息库...")
-        insert_highlight_to_info(
-            mark_text, title, book_url, book_page_id, 
-            note_page_ids=note_page_ids if note_page_ids else None,
-            chapter_title=chapter_title
-        )
-        highlight_count += 1
-        time.sleep(0.3)
+        if bookmark.get("bookmarkId"):
+            annotation_entry["bookmarks"][bookmark["bookmarkId"]] = {
+                "chapterUid": chapter_uid,
+                "range": bookmark.get("range"),
+                "page_id": info_page_id,
+            }
+    
+    # 新增的笔记补充关联到之前已同步的划线
+    relinked_count = relink_highlights(annotation_entry, created_notes, note_intervals, created_bookmark_ids)
+    if relinked_count:
+        print(f"    🔗 {relinked_count} 条已有划线关联了新增的笔记")
+    
+    # 全部处理成功后才保存新的 synckey，失败时下次会重新获取这批变化
+    commit_annotation_entry(book_id, annotation_entry, removed_bookmarks, removed_reviews)
     
     # 输出统计信息
     total_highlights = len(bookmark_list)
     total_notes = len(notes) + len(summary)
     if total_highlights > 0:
         print(f"    ✓ 划线处理完成: 共 {total_highlights} 条，新增 {highlight_count} 条", end="")
+        if updated_highlight_count > 0:
+            print(f"，更新 {updated_highlight_count} 条已编辑的划线", end="")
         if skipped_count > 0:
             print(f"，跳过 {skipped_count} 条已存在的划线")
         else:
             print()
     if total_notes > 0:
         print(f"    ✓ 笔记处理完成: 共 {total_notes} 条，新增 {note_count} 条", end="")
-        skipped_notes = total_notes - note_count
+        if updated_note_count > 0:
+            print(f"，更新 {updated_note_count} 条已编辑的笔记", end="")
+        skipped_notes = total_notes - note_count - updated_note_count
         if skipped_notes > 0:
             print(f"，跳过 {skipped_notes} 条已存在的笔记")
         else:
@@ -907,10 +1887,250 @@ def sync_book(book_data):
     return book_page_id
 
 
+def recover_journal():
+    """上次运行中途退出时，把日志中已完成的操作补记到台账，这些操作不需要重新查询"""
+    unfinished = journal.get_unfinished_books()
+    if not unfinished:
+        return
+    committed = journal.get_committed()
+    for record in committed:
+        ledger.put(record["kind"], record["id"], record["book"], record["page_id"], record["hash"])
+    in_doubt = sum(journal.is_in_doubt(kind, weread_id) for kind, weread_id in journal.recovered)
+    print(
+        f"📒 同步日志: {len(unfinished)} 本书籍上次没有同步完，恢复 {len(committed)} 个已完成的操作，"
+        f"{in_doubt} 个创建操作需要确认"
+    )
+
+
+def load_catalogs():
+    """加载书籍目录，清空去重索引（之后按书籍加载）"""
+    global catalogs_loaded_at
+    load_book_catalog()
+    reset_dedup_index()
+    catalogs_loaded_at = time.time()
+
+
+def get_deadline(started_at, budget):
+    """由开始时间和时间预算计算调度截止时间（预留 SYNC_TIME_MARGIN 的收尾时间），预算为 0 时返回 None"""
+    if not budget or budget <= 0:
+        return None
+    return started_at + budget * (1 - SYNC_TIME_MARGIN)
+
+
+def sync_changed_books(books, sync_state, options, full=False, deadline=None):
+    """
+    同步笔记本列表中有变化的书籍
+    
+    Args:
+        books: 笔记本列表
+        sync_state: 增量同步状态
+        options: 命令行参数（--workers、--fetch-concurrency、--queue-size）
+        full: 为 True 时同步全部书籍并重新获取全部划线和笔记（--all）
+        deadline: 截止时间（time.monotonic()）；预计来不及同步的书籍留到下次（--time-budget）
+    
+    Returns:
+        tuple: (有变化的书籍数量, 同步失败的数量)
+    """
+    global annotation_full_sync
+    notebook_fingerprint = get_notebook_fingerprint(books)
+    annotation_full_sync = full
+    if not full:
+        # 增量同步：只处理指纹变化过的书籍
+        books = [book_data for book_data in books if is_book_changed(book_data, sync_state)]
+        print(f"🔄 增量同步: {len(books)} 本书籍有变化\n")
+    # 最近有变化的书籍优先，同一时间的按待同步内容从少到多；
+    # 调度器根据已完成书籍的耗时估计剩余书籍能否在截止时间前完成
+    scheduler = BookScheduler(
+        [
+            (
+                book_data,
+                get_pending_work(
+                    book_data, None if full else sync_state["books"].get(book_data["book"]["bookId"])
+                ),
+            )
+            for book_data in books
+        ],
+        deadline=deadline,
+        workers=options.workers,
+        unit_seconds=1 / NOTION_RATE_LIMIT,
+    )
+    # 书籍目录和去重索引在内存中随写入更新；--daemon 时超过有效期才重新加载
+    if books and (catalogs_loaded_at is None or time.time() - catalogs_loaded_at > CATALOG_TTL):
+        load_catalogs()
+    # 只有少量书籍变化时按书籍查询去重索引；--all 时逐本查询反而更慢，一次性加载整个数据库
+    if books and full and not dedup_index_full:
+        load_dedup_index()
+    
+    def run_sync_book(index, book_data, fetched):
+        # 在队列中等待期间可能已经到了截止时间，来不及的书籍不再开始
+        if not scheduler.start(book_data):
+            return None
+        print(f"\n[{index + 1}/{len(books)}]")
+        if sync_plan is not None:
+            sync_plan.start_book(book_data["book"]["bookId"], book_data["book"].get("title"))
+        started_at = time.monotonic()
+        try:
+            return sync_book(book_data, fetched)
+        finally:
+            scheduler.done(book_data, time.monotonic() - started_at)
+    
+    def fetch_batch(batch):
+        book_ids = [book_data["book"]["bookId"] for book_data in batch]
+        fetched_data = fetch_books_data(book_ids, concurrency=options.fetch_concurrency)
+        return [fetched_data[book_id] for book_id in book_ids]
+    
+    # 需要同步的书籍的章节信息分批一次性获取
+    preload_chapter_infos([
+        book_data["book"]["bookId"]
+        for book_data in books
+        if "chapter_info" in get_fetch_endpoints(book_data["book"]["bookId"])
+    ])
+    if profiler is not None:
+        fetch_batch = profiler.wrap(fetch_batch)
+        run_sync_book = profiler.wrap(run_sync_book)
+    failed_count = 0
+    # 微信读书数据由生产者线程分批并发获取，放入有界队列；
+    # --workers 个线程从队列中取出书籍写入 Notion（Notion 请求由全局令牌桶限速）
+    for book_data, error in run_pipeline(
+        scheduler,
+        fetch_batch,
+        run_sync_book,
+        workers=options.workers,
+        batch_size=options.fetch_concurrency,
+        maxsize=options.queue_size,
+    ):
+        if error is not None:
+            print(f"    ❌ 同步失败: {book_data.get('book', {}).get('title')}: {error}")
+            failed_count += 1
+            continue
+        if scheduler.is_deferred(book_data):
+            continue
+        mark_book_synced(book_data, sync_state)
+    # 本次运行（--daemon 时为本轮）新获取的书籍详情一次性写回缓存
+    save_bookinfo_cache()
+    if scheduler.deferred:
+        print(f"\n⏳ 时间预算不足，{len(scheduler.deferred)} 本书籍留到下次同步")
+    # 全部书籍都同步成功时记录整个笔记本列表的指纹，下次没有变化时直接退出
+    complete = failed_count == 0 and not scheduler.deferred
+    mark_notebook_synced(notebook_fingerprint if complete else None, sync_state)
+    return len(books), failed_count
+
+
+def run_daemon(books, sync_state, options):
+    """
+    常驻模式（--daemon）：复用微信读书会话、Notion 客户端和内存中的书籍目录，
+    按自适应间隔轮询笔记本列表，只同步有变化的书籍
+    有变化时下次间隔回到 --interval-min（正在阅读），否则逐步放宽到 --interval-max
+    """
+    interval = options.interval_min
+    full = options.all
+    cycle = 0
+    while True:
+        cycle += 1
+        changed = False
+        deadline = get_deadline(time.monotonic(), options.time_budget)
+        # 重试预算按轮计算，之前几轮用完预算后，之后的 429 和 5xx 仍然可以重试
+        notion_retry_policies.reset_budgets()
+        session.retry_policies.reset_budgets()
+        try:
+            if books is None:
+                books = get_notebooklist()
+            cloud_config = get_cloud_config()
+            if books is None and cloud_config:
+                # Cookie 可能已失效，重新从 CookieCloud 获取
+                books = ensure_valid_cookie(session.get_cookie_string(), start_cloud_cookie_fetch(*cloud_config))
+            if books is None:
+                print("❌ 未能获取书籍列表，请检查Cookie是否有效")
+            elif full or sync_state.get("notebook") != get_notebook_fingerprint(books):
+                print(f"\n[{datetime.now().strftime('%H:%M:%S')}] 第 {cycle} 轮: 笔记本列表有变化")
+                synced_count, failed_count = sync_changed_books(
+                    books, sync_state, options, full=full, deadline=deadline
+                )
+                changed = synced_count > 0
+                print(f"✅ 本轮同步 {synced_count - failed_count} 本书籍，失败 {failed_count} 本")
+                full = False
+        except Exception as e:
+            print(f"❌ 第 {cycle} 轮同步失败: {e}")
+        write_metrics(options.metrics_prom, verbose=False)
+        books = None
+        interval = options.interval_min if changed else min(options.interval_max, interval * DAEMON_BACKOFF)
+        time.sleep(interval)
+
+
 if __name__ == "__main__":
+    started_at = time.monotonic()
     parser = argparse.ArgumentParser(description="同步微信读书到Notion")
     parser.add_argument("--all", action="store_true", help="同步所有书籍，忽略已同步状态")
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="只生成同步计划（操作列表、请求数和预计耗时），不写入 Notion",
+    )
+    parser.add_argument("--workers", type=int, default=1, help="同时同步的书籍数量，默认为1")
+    parser.add_argument(
+        "--fetch-concurrency",
+        type=int,
+        default=WEREAD_FETCH_CONCURRENCY,
+        help=f"同时进行的微信读书请求数量，默认为{WEREAD_FETCH_CONCURRENCY}",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=WEREAD_QUEUE_SIZE,
+        help="已获取、等待写入 Notion 的书籍数量上限，默认为 --workers 的两倍",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="性能分析：按阶段统计耗时，并把 pstats 和火焰图数据写入 OUT_FOLDER",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="常驻运行，按自适应间隔轮询笔记本列表并同步有变化的书籍",
+    )
+    parser.add_argument(
+        "--interval-min",
+        type=float,
+        default=DAEMON_INTERVAL_MIN,
+        help=f"--daemon 时有变化后的轮询间隔（秒），默认为{DAEMON_INTERVAL_MIN:g}",
+    )
+    parser.add_argument(
+        "--interval-max",
+        type=float,
+        default=DAEMON_INTERVAL_MAX,
+        help=f"--daemon 时长时间没有变化时的最长轮询间隔（秒），默认为{DAEMON_INTERVAL_MAX:g}",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        default=SYNC_TIME_BUDGET,
+        help="同步的时间预算（秒，--daemon 时为每一轮），来不及同步的书籍留到下次，默认不限",
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        default=METRICS_PROM_FILE,
+        help="把请求统计另外写入 Prometheus textfile（默认读取 METRICS_PROM_FILE 环境变量）",
+    )
     options = parser.parse_args()
+    if options.daemon and options.plan:
+        parser.error("--daemon 不能与 --plan 同时使用")
+    if options.profile:
+        from profiler import Profiler
+
+        profiler = Profiler()
+        # 限流等待和重试退避从所在阶段中扣除，单独计入 sleeps 阶段
+        request_metrics.on_sleep = lambda kind, seconds: profiler.stages.record_nested("sleeps", seconds)
+        profiler.start()
+        atexit.register(write_profile)
+    if options.plan:
+        # 在验证 Cookie 之前创建，--plan 时不写入 Cookie 缓存等任何本地状态
+        from plan import SyncPlan
+        
+        sync_plan = SyncPlan(
+            NOTION_RATE_LIMIT,
+            {BOOK_DATABASE_ID: "书籍", NOTE_DATABASE_ID: "笔记", INFO_DATABASE_ID: "信息"},
+        )
     
     print("=" * 50)
     print("微信读书 → Notion 同步工具")
@@ -920,30 +2140,58 @@ if __name__ == "__main__":
     print(f"信息数据库: {INFO_DATABASE_ID}")
     print("=" * 50)
     
-    weread_cookie = get_cookie()
+    weread_cookie, cloud_cookie = get_cookie()
 
+    # 会话过期时（401 或登录失效的 errcode）才刷新 Cookie，启动时不额外访问首页
+    session = WereadSession(
+        parse_cookie_string(weread_cookie), WEREAD_URL, weread_limiter, request_metrics
+    )
     
-    session = requests.Session()
-    session.cookies = parse_cookie_string(weread_cookie)
-    client = Client(auth=NOTION_TOKEN, log_level=logging.ERROR)
-    
-    session.get(WEREAD_URL)
+    # 无论同步是否成功，退出时都写出请求统计
+    atexit.register(write_metrics, options.metrics_prom)
     
-    books = get_notebooklist()
-    if books:
+    books = ensure_valid_cookie(weread_cookie, cloud_cookie)
+    sync_state = load_state(SYNC_STATE_FILE, {"books": {}})
+    if (
+        books
+        and not options.daemon
+        and not options.all
+        and not options.plan
+        and sync_state.get("notebook") == get_notebook_fingerprint(books)
+    ):
+        # 笔记本列表与上次完整同步时相同：不创建 Notion 客户端，也不做任何逐书处理
+        print(f"\n✅ {len(books)} 本书籍的笔记本列表没有变化，无需同步")
+        raise SystemExit(0)
+    
+    # Notion 客户端较重，确认需要同步后才导入和创建
+    from notion_client import Client
+    
+    client = Client(auth=NOTION_TOKEN, base_url=NOTION_BASE_URL, log_level=logging.ERROR)
+    ledger = SyncLedger(get_state_path(LEDGER_FILE), read_only=options.plan)
+    journal = SyncJournal(get_state_path(JOURNAL_FILE), read_only=options.plan)
+    recover_journal()
+    
+    if options.daemon:
+        # 停止（Ctrl+C 或 SIGTERM）时正常退出，写出请求统计
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            run_daemon(books, sync_state, options)
+        except KeyboardInterrupt:
+            print("\n👋 已停止")
+    elif books:
         print(f"\n📚 发现 {len(books)} 本书籍\n")
+        sync_changed_books(
+            books, sync_state, options, full=options.all, deadline=get_deadline(started_at, options.time_budget)
+        )
         
-        for index, book_data in enumerate(books):
-            print(f"\n[{index + 1}/{len(books)}]")
-            try:
-                sync_book(book_data)
-            except Exception as e:
-                print(f"    ❌ 同步失败: {e}")
-                continue
-            time.sleep(0.5)
-        
+        print(f"\n🍪 会话过期 {session.expired_count} 次，刷新 Cookie {session.refresh_count} 次")
+        request_metrics.print_summary()
+        if sync_plan is not None:
+            sync_plan.print_summary()
+            save_state(PLAN_FILE, sync_plan.to_dict())
+            print(f"📄 计划已写入 {get_state_path(PLAN_FILE)}")
         print("\n" + "=" * 50)
-        print("✅ 同步完成!")
+        print("✅ 计划生成完成!" if sync_plan is not None else "✅ 同步完成!")
         print("=" * 50)
     else:
         print("❌ 未能获取书籍列表，请检查Cookie是否有效")
@@ -0,0 +1,113 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+from retry_policy import RetryPolicies, call_with_retry, classify_weread_response
+
+# 微信读书表示登录失效的错误码
+SESSION_EXPIRED_ERRCODES = {-2010, -2012, -2013}
+
+
+def is_session_expired(response):
+    """根据响应判断微信读书会话是否已过期（401 或登录失效的 errcode）"""
+    if response.status_code == 401:
+        return True
+    try:
+        data = response.json()
+    except ValueError:
+        return False
+    return isinstance(data, dict) and data.get("errcode") in SESSION_EXPIRED_ERRCODES
+
+
+class WereadSession:
+    """
+    微信读书会话管理
+    启动时不访问首页，只有在响应表明会话过期（401 或登录失效的 errcode）时才访问首页刷新 Cookie 并重试一次
+    网络错误、429 和 5xx 按每个接口的重试策略退避重试
+
+    Args:
+        cookies: 登录 Cookie（CookieJar）
+        home_url: 用于刷新 Cookie 的微信读书首页
+        limiter: 微信读书请求共享的 TokenBucket（可选）
+        metrics: RequestMetrics（可选），按接口记录请求统计
+    """
+
+    def __init__(self, cookies, home_url, limiter=None, metrics=None):
+        self.session = requests.Session()
+        self.session.cookies = cookies
+        self.home_url = home_url
+        self.limiter = limiter
+        self.metrics = metrics
+        self.retry_policies = RetryPolicies(max_attempts=3, base_delay=1.0, max_delay=30.0, budget=30)
+        self.lock = threading.Lock()
+        # 刷新次数，每次刷新 generation 加一，避免多个线程同时发现过期时重复刷新
+        self.refresh_count = 0
+        self.expired_count = 0
+        self.generation = 0
+
+    def refresh(self, generation=None):
+        """访问首页刷新 Cookie；如果其他线程已经在 generation 之后刷新过则跳过"""
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            started = time.perf_counter()
+            response = self.session.get(self.home_url)
+            if self.metrics is not None:
+                endpoint = self._get_endpoint("GET", self.home_url)
+                self.metrics.record_request(endpoint, time.perf_counter() - started, error=not response.ok)
+                self._record_bytes(endpoint, response)
+            self.refresh_count += 1
+            self.generation += 1
+
+    def reset(self, cookies):
+        """换用新的登录 Cookie（例如缓存的 Cookie 已失效），并刷新一次"""
+        with self.lock:
+            self.session.cookies = cookies
+        self.refresh()
+
+    def get_cookie_string(self):
+        """当前会话的 Cookie（包括刷新后服务端更新的值）"""
+        return "; ".join(f"{cookie.name}={cookie.value}" for cookie in self.session.cookies)
+
+    @staticmethod
+    def _get_endpoint(method, url):
+        return f"weread {method} {urlparse(url).path}"
+
+    def _record_bytes(self, endpoint, response):
+        body = response.request.body or b""
+        self.metrics.record_bytes(endpoint, len(body), len(response.content))
+
+    def _send(self, method, url, **kwargs):
+        endpoint = self._get_endpoint(method, url)
+
+        def send():
+            response = self.session.request(method, url, **kwargs)
+            if self.metrics is not None:
+                self._record_bytes(endpoint, response)
+            return response
+
+        return call_with_retry(
+            send,
+            self.retry_policies.get(url),
+            classify_weread_response,
+            self.limiter,
+            self.metrics,
+            endpoint,
+        )
+
+    def request(self, method, url, **kwargs):
+        generation = self.generation
+        response = self._send(method, url, **kwargs)
+        if is_session_expired(response):
+            self.expired_count += 1
+            self.refresh(generation)
+            response = self._send(method, url, **kwargs)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)